@@ -13,6 +13,10 @@ PROJECT_NAME = "Krishi Sahayak - AI-Powered Agriculture Assistant"
 # Set GROQ_API_KEY in your .env file (see .env.example for template)
 GROQ_API_KEY = os.getenv("GROQ_API_KEY", "")
 
+# --- Explainable AI ---
+# Set XAI_MIXED_PRECISION=1 to run Grad-CAM / SHAP in float16 (Tensor-Core GPUs)
+XAI_MIXED_PRECISION = os.getenv("XAI_MIXED_PRECISION", "0").lower() in ("1", "true", "yes")
+
 # --- File Paths ---
 BASE_DIR = Path(__file__).resolve().parent
 
@@ -9,6 +9,21 @@ import random
 from datetime import datetime
 from modules.enhanced_chatbot import create_chat_interface
 
+def create_client():
+    """
+    Create a Groq client backed by a keep-alive HTTP connection pool.
+    Returns None when no API key is configured.
+    """
+    if not GROQ_API_KEY or not GROQ_API_KEY.strip():
+        return None
+    
+    http_client = httpx.Client(
+        timeout=60.0,
+        follow_redirects=True,
+        limits=httpx.Limits(max_keepalive_connections=5, max_connections=10)
+    )
+    return Groq(api_key=GROQ_API_KEY, http_client=http_client)
+
 def get_chatbot_response(user_query, sector_name, analysis_result=None):
     """
     Enhanced chatbot response function with better error handling
@@ -95,12 +110,13 @@ I'm experiencing technical difficulties: {error_msg}
 
 I apologize for the inconvenience and will be back online shortly."""
 
-def display_chat_interface(sector_name, analysis_result=None, unique_key=None):
+def display_chat_interface(sector_name, analysis_result=None, unique_key=None, client=None):
     """
-    Enhanced chat interface with better styling and functionality
+    Enhanced chat interface with better styling and functionality.
+    Pass a long-lived client (see create_client) to reuse its connections across reruns.
     """
     # Use the enhanced chat interface
-    create_chat_interface(sector_name, analysis_result, use_api=True, unique_key=unique_key)
+    create_chat_interface(sector_name, analysis_result, use_api=True, unique_key=unique_key, client=client)
 
 def display_foundational_chat_interface(sector_name, analysis_result=None, unique_key=None):
     """
@@ -507,9 +507,11 @@ And the following **4 subjects only:**
         return tips.get(category, "Keep learning and adapting your farming practices based on local conditions and experiences.")
 
 
-def create_chat_interface(sector_name: str, analysis_context: str = None, use_api: bool = True, unique_key: str = None):
+def create_chat_interface(sector_name: str, analysis_context: str = None, use_api: bool = True, unique_key: str = None, client=None):
     """
     FIXED VERSION: Create chat interface that doesn't reload the page
+    
+    client: optional pre-built Groq client to reuse; one is created per message if omitted
     """
     
     # Use unique key to separate different chatbot instances
@@ -618,13 +620,15 @@ def create_chat_interface(sector_name: str, analysis_context: str = None, use_ap
                     """
                 else:
                     system_prompt = CHATBOT_PROMPTS.get(sector_name, "You are a helpful agricultural assistant.")
-                    # Create HTTP client with proper timeout and proxy support
-                    http_client = httpx.Client(timeout=60.0, follow_redirects=True)
-                    client = Groq(api_key=GROQ_API_KEY, http_client=http_client)
+                    groq_client = client
+                    if groq_client is None:
+                        # Create HTTP client with proper timeout and proxy support
+                        http_client = httpx.Client(timeout=60.0, follow_redirects=True)
+                        groq_client = Groq(api_key=GROQ_API_KEY, http_client=http_client)
                     
                     context_message = f"Analysis: {analysis_context}\n\nQuestion: {user_input}" if analysis_context else user_input
                     
-                    chat_completion = client.chat.completions.create(
+                    chat_completion = groq_client.chat.completions.create(
                         messages=[
                             {"role": "system", "content": system_prompt},
                             {"role": "user", "content": context_message}
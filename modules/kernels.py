@@ -0,0 +1,50 @@
+"""
+Numba-compiled per-pixel kernels shared by the Streamlit pages.
+
+Kept out of the page scripts so each kernel is compiled once per process instead of
+being re-decorated on every Streamlit rerun. The kernels are only defined when Numba
+is installed; callers check NUMBA_AVAILABLE and keep a NumPy/OpenCV fallback.
+"""
+
+import numpy as np
+
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+if NUMBA_AVAILABLE:
+    @njit(parallel=True, cache=True)
+    def blend_health_overlay(image, health_map, healthy_threshold, moderate_threshold, alpha, out):
+        """Classify health scores and alpha blend the class colour into a preallocated (H, W, 3) uint8 array"""
+        height, width = health_map.shape
+        for i in prange(height):
+            for j in range(width):
+                score = health_map[i, j]
+                if score > healthy_threshold:
+                    r, g, b = 0, 255, 0  # Green for healthy
+                elif score > moderate_threshold:
+                    r, g, b = 255, 165, 0  # Orange for moderate
+                else:
+                    r, g, b = 255, 0, 0  # Red for poor
+                out[i, j, 0] = np.uint8((1 - alpha) * image[i, j, 0] + alpha * r + 0.5)
+                out[i, j, 1] = np.uint8((1 - alpha) * image[i, j, 1] + alpha * g + 0.5)
+                out[i, j, 2] = np.uint8((1 - alpha) * image[i, j, 2] + alpha * b + 0.5)
+
+    @njit(parallel=True, cache=True)
+    def fused_vegetation_indices(nir, red, red_mean, out):
+        """Compiled NDVI / EVI / NDWI / SAVI in one pass over the bands, into planes 0-3 of out"""
+        height, width = nir.shape
+        for i in prange(height):
+            for j in range(width):
+                n = np.float32(nir[i, j])
+                r = np.float32(red[i, j])
+                diff = n - r
+                total = n + r
+                ratio = diff / total if total != 0 else np.float32(0.0)
+                evi_den = n + 6 * r - 7.5 * red_mean + 1
+                out[0, i, j] = ratio
+                out[1, i, j] = 2.5 * diff / evi_den if evi_den != 0 else np.float32(0.0)
+                out[2, i, j] = ratio
+                out[3, i, j] = diff / (total + 0.5) * 1.5
@@ -13,6 +13,7 @@ import io
 import base64
 from datetime import datetime
 import json
+from xml.sax.saxutils import escape
 
 class PDFReportGenerator:
     def __init__(self):
@@ -179,6 +180,61 @@ class PDFReportGenerator:
         buffer.seek(0)
         return buffer
 
+    def create_report_sections_pdf(self, title, sections):
+        """Generate PDF report from an iterable of (section_name, section) pairs"""
+        buffer = io.BytesIO()
+        doc = SimpleDocTemplate(buffer, pagesize=A4, rightMargin=72, leftMargin=72, topMargin=72, bottomMargin=18)
+        
+        story = []
+        
+        # Title
+        story.append(Paragraph(title, self.styles['CustomTitle']))
+        story.append(Paragraph(f"Generated on: {datetime.now().strftime('%B %d, %Y at %I:%M %p')}", self.styles['BodyText']))
+        story.append(Spacer(1, 20))
+        
+        for section_name, section in sections:
+            story.append(Paragraph(section_name.replace('_', ' ').title(), self.styles['SectionHeader']))
+            story.extend(self._section_flowables(section))
+            story.append(Spacer(1, 20))
+        
+        # Footer
+        story.append(Paragraph("Built with ❤️ for Indian Agriculture | Jai Jawan, Jai Kisan!", self.styles['BodyText']))
+        
+        doc.build(story)
+        buffer.seek(0)
+        return buffer
+    
+    def _section_flowables(self, section):
+        """Render one report section: dicts as key/value tables, lists as bullets"""
+        if isinstance(section, dict):
+            flowables = []
+            rows = [['Item', 'Value']]
+            for key, value in section.items():
+                label = key.replace('_', ' ').title()
+                if isinstance(value, (dict, list)):
+                    flowables.append(Paragraph(f"{escape(label)}:", self.styles['Subsection']))
+                    flowables.extend(self._section_flowables(value))
+                else:
+                    rows.append([label, Paragraph(escape(str(value)), self.styles['BodyText'])])
+            
+            if len(rows) > 1:
+                table = Table(rows, colWidths=[2*inch, 3.5*inch])
+                table.setStyle(TableStyle([
+                    ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+                    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+                    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+                    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+                    ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+                    ('GRID', (0, 0), (-1, -1), 1, colors.black)
+                ]))
+                flowables.insert(0, table)
+            return flowables
+        
+        if isinstance(section, list):
+            return [Paragraph(f"• {escape(str(item))}", self.styles['BodyText']) for item in section]
+        
+        return [Paragraph(escape(str(section)), self.styles['BodyText'])]
+
     def create_pest_detection_pdf(self, analysis_results, image_info):
         """Generate PDF report for Pest Detection analysis"""
         buffer = io.BytesIO()
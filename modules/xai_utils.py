@@ -11,6 +11,51 @@ import matplotlib.pyplot as plt
 import matplotlib.cm as cm
 from PIL import Image
 import streamlit as st
+import os
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+from config import XAI_MIXED_PRECISION
+
+# Opt-in mixed precision: heatmaps are qualitative, so fp16 precision loss is acceptable
+XAI_COMPUTE_DTYPE = tf.float16 if XAI_MIXED_PRECISION else tf.float32
+if XAI_MIXED_PRECISION:
+    tf.keras.mixed_precision.set_global_policy('mixed_float16')
+
+# Last conv layer name per model (weak keys: entries go away with the model)
+_LAST_CONV_CACHE = weakref.WeakKeyDictionary()
+
+# (model path, mtime) per model loaded through load_xai_model; used as the result-cache identity
+_MODEL_KEYS = weakref.WeakKeyDictionary()
+
+
+@st.cache_resource(show_spinner=False)
+def _load_model_resource(model_path, mtime):
+    """Load a Keras model once per (path, mtime), shared across reruns and sessions"""
+    model = tf.keras.models.load_model(model_path, compile=False)
+    _MODEL_KEYS[model] = (model_path, mtime)
+    return model
+
+
+@st.cache_resource
+def _explanation_executor():
+    """Background threads for LIME/SHAP runs, shared across reruns and sessions"""
+    return ThreadPoolExecutor(max_workers=2)
+
+
+def load_xai_model(model_path):
+    """
+    Load a saved Keras model for explanation, reusing the loaded instance
+    
+    Args:
+        model_path: Path to the saved Keras model
+    
+    Returns:
+        model: Keras model (reloaded only when the file changes)
+    """
+    model_path = str(model_path)
+    return _load_model_resource(model_path, os.path.getmtime(model_path))
+
 
 def make_gradcam_heatmap(img_array, model, last_conv_layer_name, pred_index=None):
     """
@@ -25,6 +70,23 @@ def make_gradcam_heatmap(img_array, model, last_conv_layer_name, pred_index=None
     Returns:
         heatmap: Grad-CAM heatmap (H, W)
     """
+    if pred_index is not None:
+        pred_index = int(pred_index)
+    model_key = _MODEL_KEYS.get(model)
+    if model_key is None:
+        # Not loaded through load_xai_model: no stable identity to cache on
+        return _compute_gradcam_heatmap(img_array, model, last_conv_layer_name, pred_index)
+    return _cached_gradcam_heatmap(img_array, model, model_key, last_conv_layer_name, pred_index)
+
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def _cached_gradcam_heatmap(img_array, _model, model_key, last_conv_layer_name, pred_index):
+    """Grad-CAM computation, cached on image contents, model file (path, mtime), layer and class"""
+    return _compute_gradcam_heatmap(img_array, _model, last_conv_layer_name, pred_index)
+
+
+def _compute_gradcam_heatmap(img_array, model, last_conv_layer_name, pred_index):
+    """Grad-CAM heatmap for one image (uncached)"""
     # Create a model that maps input to activations and output
     grad_model = Model(
         inputs=[model.inputs],
@@ -32,6 +94,7 @@ def make_gradcam_heatmap(img_array, model, last_conv_layer_name, pred_index=None
     )
     
     # Compute gradient of top predicted class
+    img_array = tf.cast(img_array, XAI_COMPUTE_DTYPE)
     with tf.GradientTape() as tape:
         conv_outputs, predictions = grad_model(img_array)
         if pred_index is None:
@@ -49,8 +112,12 @@ def make_gradcam_heatmap(img_array, model, last_conv_layer_name, pred_index=None
     heatmap = conv_outputs @ pooled_grads[..., tf.newaxis]
     heatmap = tf.squeeze(heatmap)
     
-    # Normalize heatmap
-    heatmap = tf.maximum(heatmap, 0) / tf.math.reduce_max(heatmap)
+    # Back to float32 before normalizing to avoid fp16 overflow
+    heatmap = tf.cast(heatmap, tf.float32)
+    
+    # ReLU then normalize; epsilon keeps an all-zero map at zero instead of NaN
+    heatmap = tf.nn.relu(heatmap)
+    heatmap = heatmap / (tf.reduce_max(heatmap) + tf.constant(1e-8, heatmap.dtype))
     return heatmap.numpy()
 
 
@@ -68,10 +135,10 @@ def create_gradcam_overlay(img, heatmap, alpha=0.4, colormap=cv2.COLORMAP_JET):
         overlay: Image with heatmap overlay
     """
     # Resize heatmap to match image size
-    heatmap = cv2.resize(heatmap, (img.shape[1], img.shape[0]))
+    heatmap = cv2.resize(heatmap, (img.shape[1], img.shape[0]), interpolation=cv2.INTER_LINEAR)
     
     # Convert heatmap to RGB
-    heatmap = np.uint8(255 * heatmap)
+    heatmap = cv2.convertScaleAbs(heatmap, alpha=255.0)
     heatmap = cv2.applyColorMap(heatmap, colormap)
     
     # Convert BGR to RGB
@@ -79,7 +146,7 @@ def create_gradcam_overlay(img, heatmap, alpha=0.4, colormap=cv2.COLORMAP_JET):
     
     # Ensure img is uint8
     if img.dtype != np.uint8:
-        img = np.uint8(255 * img)
+        img = cv2.convertScaleAbs(img, alpha=255.0)
     
     # Create overlay
     overlay = cv2.addWeighted(img, 1 - alpha, heatmap, alpha, 0)
@@ -98,18 +165,24 @@ def get_region_importance_scores(heatmap, num_regions=5):
     Returns:
         regions: List of (x, y, w, h, score) tuples
     """
-    # Threshold heatmap
-    threshold = np.percentile(heatmap, 90)
+    # Threshold heatmap at the 90th percentile (quickselect, no full sort)
+    flat = heatmap.ravel()
+    k = int(0.9 * flat.size)
+    threshold = np.partition(flat, k)[k]
     binary_map = (heatmap > threshold).astype(np.uint8)
     
     # Find contours
     contours, _ = cv2.findContours(binary_map, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
     
+    # Summed-area table so each region mean is four lookups
+    sat = cv2.integral(heatmap.astype(np.float32), sdepth=cv2.CV_64F)
+    
     # Extract regions with scores
     regions = []
     for contour in contours:
         x, y, w, h = cv2.boundingRect(contour)
-        region_score = np.mean(heatmap[y:y+h, x:x+w])
+        region_sum = sat[y+h, x+w] - sat[y, x+w] - sat[y+h, x] + sat[y, x]
+        region_score = region_sum / (w * h)
         regions.append({
             'bbox': (x, y, w, h),
             'score': float(region_score),
@@ -122,7 +195,7 @@ def get_region_importance_scores(heatmap, num_regions=5):
     return regions
 
 
-def generate_lime_explanation(image, model, num_samples=1000, num_features=10):
+def generate_lime_explanation(image, model, num_samples=1000, num_features=10, top_labels=5):
     """
     Generate LIME explanation for image classification
     
@@ -131,10 +204,37 @@ def generate_lime_explanation(image, model, num_samples=1000, num_features=10):
         model: Prediction model
         num_samples: Number of perturbed samples
         num_features: Number of superpixels
+        top_labels: Number of top predicted labels to explain
     
     Returns:
         explanation: LIME explanation object
     """
+    model_key = _MODEL_KEYS.get(model)
+    if model_key is None:
+        return _compute_lime_explanation(image, model, num_samples, num_features, top_labels)
+    return _cached_lime_explanation(image, model, model_key, num_samples, num_features, top_labels)
+
+
+def submit_lime_explanation(image, model, num_samples=1000, num_features=10, top_labels=5):
+    """
+    Start generate_lime_explanation on a background thread
+    
+    Returns:
+        future: concurrent.futures.Future resolving to the LIME explanation object
+    """
+    return _explanation_executor().submit(
+        generate_lime_explanation, image, model, num_samples, num_features, top_labels
+    )
+
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def _cached_lime_explanation(image, _model, model_key, num_samples, num_features, top_labels):
+    """LIME computation, cached on image contents, model file (path, mtime) and sampling settings"""
+    return _compute_lime_explanation(image, _model, num_samples, num_features, top_labels)
+
+
+def _compute_lime_explanation(image, model, num_samples, num_features, top_labels):
+    """LIME explanation for one image (uncached)"""
     try:
         from lime import lime_image
         from skimage.segmentation import mark_boundaries
@@ -144,22 +244,19 @@ def generate_lime_explanation(image, model, num_samples=1000, num_features=10):
         
         # Define prediction function
         def predict_fn(images):
-            # Preprocess images
-            processed = []
-            for img in images:
-                img_resized = cv2.resize(img, (224, 224))
-                img_normalized = img_resized / 255.0
-                processed.append(img_normalized)
+            # Preprocess images (perturbed copies of a 224x224 input need no resize)
+            images = np.asarray(images)
+            if images.shape[1:3] != (224, 224):
+                images = np.array([cv2.resize(img, (224, 224)) for img in images])
             
-            processed = np.array(processed)
-            predictions = model.predict(processed, verbose=0)
+            predictions = model.predict(images / 255.0, verbose=0)
             return predictions
         
         # Generate explanation
         explanation = explainer.explain_instance(
             image,
             predict_fn,
-            top_labels=5,
+            top_labels=top_labels,
             hide_color=0,
             num_samples=num_samples,
             segmentation_fn=None
@@ -184,11 +281,37 @@ def generate_shap_values(image, model, background_samples=50):
     Returns:
         shap_values: SHAP values array
     """
+    model_key = _MODEL_KEYS.get(model)
+    if model_key is None:
+        return _compute_shap_values(image, model, background_samples)
+    return _cached_shap_values(image, model, model_key, background_samples)
+
+
+def submit_shap_values(image, model, background_samples=50):
+    """
+    Start generate_shap_values on a background thread
+    
+    Returns:
+        future: concurrent.futures.Future resolving to the SHAP values array
+    """
+    return _explanation_executor().submit(generate_shap_values, image, model, background_samples)
+
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def _cached_shap_values(image, _model, model_key, background_samples):
+    """SHAP computation, cached on image contents, model file (path, mtime) and background size"""
+    return _compute_shap_values(image, _model, background_samples)
+
+
+def _compute_shap_values(image, model, background_samples):
+    """SHAP values for one image (uncached)"""
     try:
         import shap
         
         # Create background dataset (simplified)
         background = np.random.rand(background_samples, 224, 224, 3)
+        if XAI_MIXED_PRECISION:
+            background = background.astype(np.float16)
         
         # Create explainer
         explainer = shap.DeepExplainer(model, background)
@@ -204,6 +327,17 @@ def generate_shap_values(image, model, background_samples=50):
         return None
 
 
+# OpenCV HSV ranges (H: 0-179) for colour-based disease indicators
+YELLOWING_HSV_RANGE = ((20, 80, 80), (35, 255, 255))
+BROWNING_HSV_RANGE = ((5, 50, 20), (20, 255, 200))
+
+
+def _color_ratio(hsv, lo, hi):
+    """Fraction of pixels whose HSV value lies within [lo, hi] (vectorized, no Python loop)"""
+    mask = cv2.inRange(hsv, np.array(lo, np.uint8), np.array(hi, np.uint8))
+    return cv2.countNonZero(mask) / (hsv.shape[0] * hsv.shape[1])
+
+
 def extract_image_features(image):
     """
     Extract interpretable features from image
@@ -214,24 +348,27 @@ def extract_image_features(image):
     Returns:
         features: Dictionary of feature values
     """
-    # Convert to different color spaces
+    # Convert to HSV color space
     hsv = cv2.cvtColor(image, cv2.COLOR_RGB2HSV)
-    lab = cv2.cvtColor(image, cv2.COLOR_RGB2LAB)
     
     # Color features
     mean_rgb = np.mean(image, axis=(0, 1))
     std_rgb = np.std(image, axis=(0, 1))
     mean_hsv = np.mean(hsv, axis=(0, 1))
     
+    # Disease-indicator colour ratios (reuse the HSV image)
+    yellowing_ratio = _color_ratio(hsv, *YELLOWING_HSV_RANGE)
+    browning_ratio = _color_ratio(hsv, *BROWNING_HSV_RANGE)
+    
     # Texture features (simplified)
     gray = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
     edges = cv2.Canny(gray, 50, 150)
     edge_density = np.sum(edges > 0) / edges.size
     
     # Compute gradient magnitude
-    gx = cv2.Sobel(gray, cv2.CV_64F, 1, 0, ksize=3)
-    gy = cv2.Sobel(gray, cv2.CV_64F, 0, 1, ksize=3)
-    texture_strength = np.mean(np.sqrt(gx**2 + gy**2))
+    gx = cv2.Sobel(gray, cv2.CV_32F, 1, 0, ksize=3)
+    gy = cv2.Sobel(gray, cv2.CV_32F, 0, 1, ksize=3)
+    texture_strength = np.mean(cv2.magnitude(gx, gy))
     
     features = {
         'Mean Red': float(mean_rgb[0]),
@@ -243,6 +380,8 @@ def extract_image_features(image):
         'Mean Hue': float(mean_hsv[0]),
         'Mean Saturation': float(mean_hsv[1]),
         'Mean Value': float(mean_hsv[2]),
+        'Yellowing Ratio': float(yellowing_ratio),
+        'Browning Ratio': float(browning_ratio),
         'Edge Density': float(edge_density),
         'Texture Strength': float(texture_strength)
     }
@@ -265,27 +404,34 @@ def create_counterfactual(image, model, target_class, max_iterations=100, learni
         counterfactual_image: Modified image
         changes: Dictionary of changes made
     """
-    # Convert to tensor
+    # Convert to tensor (fixed H x W x 3 shape for the compiled step)
     img_tensor = tf.Variable(image, dtype=tf.float32)
+    target = tf.constant(target_class, dtype=tf.int64)
     
-    # Optimization loop
-    for i in range(max_iterations):
+    # Step is traced exactly once: the image variable is captured with its
+    # concrete shape and the target is pinned to a scalar int64
+    @tf.function(input_signature=[tf.TensorSpec(shape=(), dtype=tf.int64)])
+    def counterfactual_step(target):
         with tf.GradientTape() as tape:
             predictions = model(tf.expand_dims(img_tensor, 0))
-            loss = -predictions[0, target_class]  # Maximize target class probability
+            loss = -predictions[0, target]  # Maximize target class probability
+        
+        # Check if target reached (reuses this step's forward pass)
+        reached = tf.equal(tf.argmax(predictions[0]), target)
         
         # Compute gradients
         gradients = tape.gradient(loss, img_tensor)
         
-        # Update image
-        img_tensor.assign_add(learning_rate * tf.sign(gradients))
-        
-        # Clip to valid range
-        img_tensor.assign(tf.clip_by_value(img_tensor, 0, 1))
+        if not reached:
+            # Update image and clip to valid range
+            img_tensor.assign_add(learning_rate * tf.sign(gradients))
+            img_tensor.assign(tf.clip_by_value(img_tensor, 0, 1))
         
-        # Check if target reached
-        current_pred = model(tf.expand_dims(img_tensor, 0))
-        if tf.argmax(current_pred[0]) == target_class:
+        return reached
+    
+    # Optimization loop
+    for i in range(max_iterations):
+        if counterfactual_step(target):
             break
     
     counterfactual_image = img_tensor.numpy()
@@ -310,12 +456,22 @@ def get_last_conv_layer_name(model):
     Returns:
         layer_name: Name of last conv layer
     """
+    cached = _LAST_CONV_CACHE.get(model)
+    if cached is not None:
+        return cached
+    
+    layer_name = None
     for layer in reversed(model.layers):
         if 'conv' in layer.name.lower():
-            return layer.name
+            layer_name = layer.name
+            break
     
     # Fallback
-    return model.layers[-4].name
+    if layer_name is None:
+        layer_name = model.layers[-4].name
+    
+    _LAST_CONV_CACHE[model] = layer_name
+    return layer_name
 
 
 def visualize_attention_regions(image, regions, title="Attention Regions"):
@@ -363,18 +519,27 @@ def calculate_model_confidence_metrics(predictions):
     Returns:
         metrics: Dictionary of confidence metrics
     """
-    top_prob = np.max(predictions)
-    top_class = np.argmax(predictions)
+    predictions = np.ascontiguousarray(predictions).ravel()
+    
+    # Top-2 classes via partial partition instead of a full sort
+    if predictions.size > 1:
+        idx = np.argpartition(-predictions, 1)[:2]
+        top2 = predictions[idx]
+        order = np.argsort(-top2)
+        top_prob = top2[order[0]]
+        top_class = idx[order[0]]
+        # Margin (difference between top 2 predictions)
+        margin = top_prob - top2[order[1]]
+    else:
+        top_prob = predictions[0]
+        top_class = 0
+        margin = top_prob
     
     # Entropy (uncertainty measure)
-    entropy = -np.sum(predictions * np.log(predictions + 1e-10))
-    max_entropy = -np.log(1.0 / len(predictions))
+    entropy = -(predictions * np.log(predictions + 1e-10)).sum()
+    max_entropy = -np.log(1.0 / predictions.size)
     normalized_entropy = entropy / max_entropy
     
-    # Margin (difference between top 2 predictions)
-    sorted_probs = np.sort(predictions)[::-1]
-    margin = sorted_probs[0] - sorted_probs[1] if len(sorted_probs) > 1 else sorted_probs[0]
-    
     metrics = {
         'top_probability': float(top_prob),
         'top_class': int(top_class),
@@ -4,18 +4,31 @@ import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
 import plotly.express as px
+import plotly.io as pio
 from PIL import Image
 import json
 import datetime
 import io
 import base64
+import zlib
+import bisect
 from pathlib import Path
-import random
+from concurrent.futures import ThreadPoolExecutor
 
 # Import modules
 from modules import preprocessing, model_inference
-from modules.pdf_generator import PDFReportGenerator, create_download_button
 from config import CUSTOM_CSS, MODEL_CONFIGS
+from modules.kernels import NUMBA_AVAILABLE
+if NUMBA_AVAILABLE:
+    from modules.kernels import blend_health_overlay
+
+# Optional orjson engine for Plotly figure serialization (much faster on large heatmaps)
+try:
+    import orjson
+    pio.json.config.default_engine = "orjson"
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
 
 # Import chatbot with error handling
 try:
@@ -25,6 +38,11 @@ except ImportError as e:
     st.error(f"❌ Chatbot module import failed: {str(e)}")
     CHATBOT_AVAILABLE = False
 
+@st.cache_resource
+def _get_chatbot_client():
+    """Groq client shared across reruns and sessions (reuses HTTP connections)"""
+    return chatbot.create_client()
+
 # Inject custom CSS
 st.markdown(CUSTOM_CSS, unsafe_allow_html=True)
 
@@ -35,14 +53,205 @@ st.set_page_config(
     layout="wide"
 )
 
-def create_confidence_chart(predictions, confidence_scores):
-    """Create confidence bar chart"""
+# Longest side of the analysis resolution shared by the downsampled image and the
+# simulated health map, so the overlay never has to resize (phone photos are often 4000x3000)
+_ANALYSIS_MAX_SIDE = 512
+
+# Health map is uint8 (0-255); overlay class thresholds correspond to 0.7 and 0.4
+_HEALTHY_THRESHOLD = 179
+_MODERATE_THRESHOLD = 102
+
+# Diagnoses scored by the multi-method analysis
+_KEYS = ("Healthy", "Nitrogen Deficiency", "Potassium Deficiency", "Phosphorus Deficiency", "General Stress")
+
+# Analysis methods, their blend weights and per-diagnosis score ranges (rows follow _METHOD_NAMES)
+_METHOD_NAMES = ("Color Analysis", "Texture Analysis", "Shape Analysis", "Pattern Analysis")
+_WEIGHTS = np.array([0.4, 0.3, 0.2, 0.1], dtype=np.float32)
+_METHOD_LOWS = np.array([
+    [20, 15, 10, 5, 5],
+    [18, 16, 12, 6, 4],
+    [22, 14, 8, 4, 6],
+    [19, 17, 11, 5, 5]
+], dtype=np.float32)
+_METHOD_HIGHS = np.array([
+    [40, 35, 25, 20, 15],
+    [38, 36, 28, 22, 16],
+    [42, 34, 24, 18, 18],
+    [39, 37, 27, 21, 17]
+], dtype=np.float32)
+
+# Deficiency zone label -> diagnosis key
+_ZONE_KEY_MAP = {
+    "Healthy": "Healthy",
+    "Nitrogen Deficient": "Nitrogen Deficiency",
+    "Potassium Deficient": "Potassium Deficiency",
+    "Phosphorus Deficient": "Phosphorus Deficiency",
+    "General Stress": "General Stress"
+}
+
+# Treatment -> (diagnosis key, priority weight)
+_TREATMENT_WEIGHTS = {
+    "Nitrogen Treatment": ("Nitrogen Deficiency", 0.8),
+    "Potassium Treatment": ("Potassium Deficiency", 0.8),
+    "Phosphorus Treatment": ("Phosphorus Deficiency", 0.8),
+    "General Care": ("General Stress", 0.6)
+}
+
+# Advisory information per diagnosis
+_ADVISORY_INFO = {
+    "Healthy": {
+        "description": "Your crop appears to be in good health with no significant nutrient deficiencies detected.",
+        "remedial_actions": ["Continue current management practices", "Monitor regularly for any changes"],
+        "preventive_measures": ["Maintain soil fertility", "Regular crop monitoring"],
+        "emoji": "✅"
+    },
+    "Nitrogen Deficiency": {
+        "description": "Yellowing of older leaves indicates nitrogen deficiency. This affects protein synthesis and overall plant growth.",
+        "remedial_actions": ["Apply urea (46-0-0) at 50-100 kg/hectare", "Use ammonium sulfate for quick response", "Foliar spray with urea 2% solution"],
+        "preventive_measures": ["Regular soil testing", "Balanced fertilizer application", "Organic matter addition"],
+        "emoji": "⚠️"
+    },
+    "Potassium Deficiency": {
+        "description": "Brown scorching on leaf edges and weak stems indicate potassium deficiency affecting water regulation.",
+        "remedial_actions": ["Apply muriate of potash (0-0-60) at 40-60 kg/hectare", "Use potassium sulfate for sensitive crops", "Foliar application of potassium nitrate"],
+        "preventive_measures": ["Maintain soil potassium levels", "Crop rotation with legumes", "Avoid excessive nitrogen"],
+        "emoji": "🔴"
+    },
+    "Phosphorus Deficiency": {
+        "description": "Purple/reddish leaves and delayed flowering indicate phosphorus deficiency affecting energy transfer.",
+        "remedial_actions": ["Apply DAP (18-46-0) or SSP (0-20-0) at 50-75 kg/hectare", "Use rock phosphate for long-term supply", "Foliar spray with phosphoric acid"],
+        "preventive_measures": ["Soil pH management (6.0-7.0)", "Organic phosphorus sources", "Proper placement of phosphorus"],
+        "emoji": "🟣"
+    },
+    "General Stress": {
+        "description": "Multiple stress factors affecting crop health including environmental and nutritional stress.",
+        "remedial_actions": ["Comprehensive soil analysis", "Balanced nutrient application", "Environmental stress management"],
+        "preventive_measures": ["Integrated crop management", "Stress-resistant varieties", "Proper irrigation management"],
+        "emoji": "🌡️"
+    }
+}
+
+# Risk level by model confidence: below 70% High, below 90% Medium, otherwise Low
+_RISK_CUTS = (70, 90)
+_RISK_LEVELS = ("High", "Medium", "Low")
+_RISK_COLORS = {"High": "#FF6B6B", "Medium": "#FFA500", "Low": "#32CD32"}
+
+# Treatment priority by severity (anything below High is Medium)
+_TREATMENT_PRIORITY = {"High": "High"}
+
+# Risk factor scores keyed on (diagnosis is a deficiency, severity level)
+_RISK_TABLE = {
+    (has_deficiency, severity): {
+        "Nutrient Deficiency": 85 if has_deficiency else 20,
+        "Crop Stress": 70 if severity == "High" else 40,
+        "Yield Impact": 60 if severity == "High" else 30,
+        "Economic Loss": 50 if severity == "High" else 25
+    }
+    for has_deficiency in (True, False)
+    for severity in ("Low", "Medium", "High")
+}
+
+# Cost-benefit ranges: treatment cost (₹/ha), yield loss (%), ROI (%), break-even (months)
+_COST_LOWS = np.array([2000, 15, 200, 2])
+_COST_HIGHS = np.array([8000, 40, 500, 6])
+
+# Outcome ranges: expected recovery (days), success rate (%)
+_OUTCOME_LOWS = np.array([7, 75])
+_OUTCOME_HIGHS = np.array([21, 95])
+
+# Shared generator (avoids re-seeding the global RNG per call)
+_RNG = np.random.default_rng()
+
+@st.cache_resource
+def _krishi_template():
+    """Shared chart style: Plotly's default look plus the page's common layout settings (built once per process)"""
+    template = go.layout.Template(pio.templates["plotly"])
+    template.layout.update(title_x=0.5, height=400, font=dict(size=12))
+    return template
+
+# HTML templates (static markup built once; only the values are formatted per rerun)
+_METRIC_TEMPLATE = """
+<div class="metric-container">
+    {heading}<h2 style="color: {color};">{value}</h2>
+    <p>{label}</p>
+</div>
+"""
+
+_HEADER_HTML = """
+<div style="text-align: center; padding: 2rem 0;">
+    <h1 style="color: #2E8B57; font-size: 3rem; margin-bottom: 1rem;">
+        🌿 Crop Health & Monitoring System
+    </h1>
+    <p style="color: #228B22; font-size: 1.2rem; max-width: 800px; margin: 0 auto;">
+        Advanced AI-powered crop health diagnosis and nutrient deficiency detection for Indian farmers.
+        Upload crop images to get detailed analysis, confidence metrics, and expert recommendations.
+    </p>
+</div>
+"""
+
+_FOOTER_HTML = """
+<div style="text-align: center; padding: 2rem; background: #2E8B57; color: white; border-radius: 10px; margin-top: 3rem;">
+    <h4>🌿 Krishi Sahayak - Crop Health & Monitoring</h4>
+    <p>Empowering Indian farmers with AI-driven crop health analysis</p>
+    <p style="font-size: 0.9rem; opacity: 0.8;">
+        Built with ❤️ for Indian Agriculture | Advanced AI Technology
+    </p>
+</div>
+"""
+
+_INFO_BOX_TEMPLATE = """
+<div class="info-box">
+    <h3>{emoji} {title}</h3>
+    <p>{description}</p>
+</div>
+"""
+
+_METRICS_ROW_TEMPLATE = '<div style="display: grid; grid-template-columns: repeat({count}, 1fr); gap: 1rem;">{cells}</div>'
+
+_SAMPLE_CARDS_HTML = """
+<div style="display: grid; grid-template-columns: repeat(3, 1fr); gap: 1rem;">
+    <div class="sample-analysis">
+        <h4>🌿 Healthy Crop</h4>
+        <p>Confidence: 92.3%</p>
+        <p>Status: Optimal health</p>
+    </div>
+    <div class="sample-analysis">
+        <h4>⚠️ Nitrogen Deficiency</h4>
+        <p>Confidence: 87.1%</p>
+        <p>Action: Apply urea</p>
+    </div>
+    <div class="sample-analysis">
+        <h4>🔴 Potassium Deficiency</h4>
+        <p>Confidence: 83.5%</p>
+        <p>Action: Apply MOP</p>
+    </div>
+</div>
+"""
+
+_CHATBOT_BANNER_HTML = """
+<div style="background: linear-gradient(135deg, #f0fff0 0%, #e8f5e8 100%); 
+            padding: 1.5rem; border-radius: 15px; margin: 1rem 0; 
+            border: 2px solid #32CD32; box-shadow: 0 8px 25px rgba(0,0,0,0.1);">
+    <h3 style="color: #228B22; margin-bottom: 1rem; text-align: center;">
+        🌿 Crop Health Specialist Chatbot
+    </h3>
+    <p style="text-align: center; color: #666; margin-bottom: 1rem;">
+        Powered by Groq AI - Specialized in crop health, nutrient deficiency, and plant pathology
+    </p>
+</div>
+"""
+
+def create_confidence_chart(predictions):
+    """Create confidence bar chart from a {diagnosis: confidence %} dict"""
+    scores = np.fromiter(predictions.values(), dtype=np.float32, count=len(predictions))
+    colors = np.select([scores < 50, scores < 80], ['#FF6B6B', '#FFA500'], default='#32CD32')
+    
     fig = go.Figure(data=[
         go.Bar(
             x=list(predictions.keys()),
-            y=list(confidence_scores.values()),
-            marker_color=['#FF6B6B' if score < 50 else '#FFA500' if score < 80 else '#32CD32' for score in confidence_scores.values()],
-            text=[f"{score:.1f}%" for score in confidence_scores.values()],
+            y=list(predictions.values()),
+            marker_color=colors.tolist(),
+            text=[f"{score:.1f}%" for score in predictions.values()],
             textposition='auto',
         )
     ])
@@ -51,33 +260,35 @@ def create_confidence_chart(predictions, confidence_scores):
         title="Confidence Levels for All Diagnoses",
         xaxis_title="Diagnosis Type",
         yaxis_title="Confidence (%)",
-        height=400,
-        showlegend=False
+        showlegend=False,
+        template=_krishi_template()
     )
     
     return fig
 
 def create_crop_health_heatmap(health_map):
     """Create an interactive crop health heatmap"""
-    fig = go.Figure(data=go.Heatmap(
-        z=health_map,
-        colorscale='RdYlGn',
-        showscale=True,
-        colorbar=dict(
+    fig = px.imshow(
+        health_map.astype(np.uint8, copy=False),
+        color_continuous_scale='RdYlGn',
+        zmin=0,
+        zmax=255,
+        aspect='auto'
+    )
+    
+    fig.update_layout(
+        title="Crop Health Distribution Analysis",
+        template=_krishi_template(),
+        height=500,
+        coloraxis_colorbar=dict(
             title=dict(
                 text="Health Score",
                 side="right"
             ),
             tickmode="array",
-            tickvals=[0, 0.25, 0.5, 0.75, 1],
+            tickvals=[0, 64, 128, 191, 255],
             ticktext=["Critical", "Poor", "Fair", "Good", "Excellent"]
-        )
-    ))
-    
-    fig.update_layout(
-        title="Crop Health Distribution Analysis",
-        title_x=0.5,
-        height=500,
+        ),
         xaxis=dict(showgrid=False),
         yaxis=dict(showgrid=False)
     )
@@ -101,10 +312,8 @@ def create_nutrient_deficiency_chart(deficiency_zones):
     
     fig.update_layout(
         title="Nutrient Deficiency Zone Distribution",
-        title_x=0.5,
         showlegend=True,
-        height=400,
-        font=dict(size=12)
+        template=_krishi_template()
     )
     
     return fig
@@ -124,10 +333,9 @@ def create_treatment_recommendations_chart(recommendations):
     
     fig.update_layout(
         title="Treatment Priority Recommendations",
-        title_x=0.5,
         xaxis_title="Treatment Type",
         yaxis_title="Priority Score",
-        height=400
+        template=_krishi_template()
     )
     
     return fig
@@ -155,64 +363,151 @@ def create_risk_assessment_chart(risk_factors):
             )),
         showlegend=True,
         title="Risk Assessment Analysis",
-        height=400
+        template=_krishi_template()
     )
     
     return fig
 
+def create_method_contributions_chart(method_data):
+    """Create bar chart of each analysis method's confidence for the diagnosis"""
+    fig = go.Figure(data=[go.Bar(
+        x=list(method_data.keys()),
+        y=list(method_data.values()),
+        marker_color=['#FF6B6B', '#FFA500', '#32CD32', '#8B4513'],
+        text=[f"{v:.1f}%" for v in method_data.values()],
+        textposition='auto',
+    )])
+    
+    fig.update_layout(
+        title="Analysis Method Contributions",
+        xaxis_title="Analysis Method",
+        yaxis_title="Confidence (%)",
+        template=_krishi_template()
+    )
+    
+    return fig
+
+@st.cache_data(show_spinner=False)
+def _metrics_html(pairs):
+    """One grid of metric cards from ((label, value), ...) pairs, emitted as a single markdown block"""
+    cells = "".join(
+        _METRIC_TEMPLATE.format(heading="", color="#2E8B57", value=value, label=label)
+        for label, value in pairs
+    )
+    return _METRICS_ROW_TEMPLATE.format(count=len(pairs), cells=cells)
+
+@st.cache_data(show_spinner=False)
+def _expected_outcomes(prediction, severity_level, confidence):
+    """Expected recovery (days) and success rate (%), fixed per analysis so reruns don't flicker"""
+    seed = zlib.crc32(f"{prediction}|{severity_level}|{confidence:.6f}".encode("utf-8"))
+    recovery_days, success_rate = np.random.default_rng(seed).integers(_OUTCOME_LOWS, _OUTCOME_HIGHS, endpoint=True)
+    return int(recovery_days), int(success_rate)
+
+# Cached chart builders: Streamlit reruns main() on every widget change, so the
+# figures are memoized on hashable snapshots (dict items / arrays) of their inputs
+@st.cache_data(show_spinner=False)
+def _cached_confidence_chart(prediction_items):
+    return create_confidence_chart(dict(prediction_items))
+
+@st.cache_data(show_spinner=False)
+def _cached_crop_health_heatmap(health_map):
+    return create_crop_health_heatmap(health_map)
+
+@st.cache_data(show_spinner=False)
+def _cached_nutrient_deficiency_chart(zone_items):
+    return create_nutrient_deficiency_chart(dict(zone_items))
+
+@st.cache_data(show_spinner=False)
+def _cached_treatment_recommendations_chart(priority_items):
+    return create_treatment_recommendations_chart({name: {'priority': p} for name, p in priority_items})
+
+@st.cache_data(show_spinner=False)
+def _cached_method_contributions_chart(method_items):
+    return create_method_contributions_chart(dict(method_items))
+
+@st.cache_data(show_spinner=False)
+def _cached_risk_assessment_chart(risk_items):
+    return create_risk_assessment_chart(dict(risk_items))
+
 def create_crop_health_map(image_size, health_score):
     """Create simulated crop health segmentation map"""
-    height, width = image_size[1], image_size[0]
-    health_map = np.zeros((height, width), dtype=np.float32)
+    # The map is only a coarse visualization, so cap its resolution (keeping aspect ratio)
+    scale = min(1.0, _ANALYSIS_MAX_SIDE / max(image_size))
+    height = max(1, int(image_size[1] * scale))
+    width = max(1, int(image_size[0] * scale))
     
-    # Create health zones based on score
+    # Create health zones based on score (base value +/- spread, on a 0-255 scale)
     if health_score > 80:
         # Healthy zones
-        health_map += np.random.uniform(0.7, 1.0, (height, width))
+        base, spread = 217, 38
     elif health_score > 60:
         # Moderate health zones
-        health_map += np.random.uniform(0.4, 0.8, (height, width))
+        base, spread = 153, 51
     else:
         # Poor health zones
-        health_map += np.random.uniform(0.0, 0.6, (height, width))
+        base, spread = 77, 77
+    
+    noise = _RNG.integers(-spread, spread, (height, width), dtype=np.int16, endpoint=True)
+    health_map = (noise + base).clip(0, 255).astype(np.uint8)
     
     return health_map
 
+def decode_uploaded_image(uploaded_file):
+    """Decode an upload straight into a contiguous RGB uint8 array (None if undecodable)
+
+    IMREAD_COLOR drops alpha and expands grayscale, so downstream code can rely on 3 channels.
+    """
+    raw = np.frombuffer(uploaded_file.getvalue(), np.uint8)
+    bgr = cv2.imdecode(raw, cv2.IMREAD_COLOR)
+    if bgr is None:
+        return None
+    return cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB)
+
+def downsample_for_analysis(image):
+    """Shrink an RGB array so the longest side is at most _ANALYSIS_MAX_SIDE"""
+    height, width = image.shape[:2]
+    scale = _ANALYSIS_MAX_SIDE / max(width, height)
+    if scale < 1:
+        return cv2.resize(image, (int(width * scale), int(height * scale)), interpolation=cv2.INTER_LINEAR)
+    return image
+
 def overlay_health_map(image, health_map):
-    """Overlay health map on original image"""
-    img_array = np.array(image)
+    """Overlay health map on original image (an RGB uint8 array from decode_uploaded_image)"""
+    img_resized = np.asarray(image)
     height, width = health_map.shape
     
-    # Resize image to match health map
-    img_resized = cv2.resize(img_array, (width, height))
-    
-    # Ensure image is RGB (3 channels)
-    if len(img_resized.shape) == 3 and img_resized.shape[2] == 4:
-        img_resized = img_resized[:, :, :3]  # Remove alpha channel if present
-    elif len(img_resized.shape) == 2:
-        img_resized = cv2.cvtColor(img_resized, cv2.COLOR_GRAY2RGB)
-    
-    # Create colored overlay based on health scores
-    health_overlay = np.zeros_like(img_resized)
-    
-    for i in range(height):
-        for j in range(width):
-            health_score = health_map[i, j]
-            if health_score > 0.7:
-                health_overlay[i, j] = [0, 255, 0]  # Green for healthy
-            elif health_score > 0.4:
-                health_overlay[i, j] = [255, 165, 0]  # Orange for moderate
-            else:
-                health_overlay[i, j] = [255, 0, 0]  # Red for poor
-    
-    # Blend with original image
+    # Image and health map are both produced at the analysis resolution
+    assert img_resized.shape == (height, width, 3), "expected an RGB image matching the health map"
+    
     alpha = 0.3
-    result = cv2.addWeighted(img_resized, 1-alpha, health_overlay, alpha, 0)
+    health_overlay = np.empty((height, width, 3), dtype=np.uint8)
+    if NUMBA_AVAILABLE:
+        # Single fused pass: the colour overlay is never materialised (first call pays the JIT cost)
+        blend_health_overlay(img_resized, health_map, _HEALTHY_THRESHOLD, _MODERATE_THRESHOLD, alpha, health_overlay)
+    else:
+        # Create colored overlay based on health scores with boolean masks
+        healthy = health_map > _HEALTHY_THRESHOLD
+        moderate = (health_map > _MODERATE_THRESHOLD) & ~healthy
+        poor = ~(healthy | moderate)
+        health_overlay[healthy] = (0, 255, 0)  # Green for healthy
+        health_overlay[moderate] = (255, 165, 0)  # Orange for moderate
+        health_overlay[poor] = (255, 0, 0)  # Red for poor
+        
+        # Blend with original image, writing into the overlay buffer (no extra allocation)
+        cv2.addWeighted(img_resized, 1-alpha, health_overlay, alpha, 0, dst=health_overlay)
     
-    return Image.fromarray(result.astype(np.uint8))
+    return Image.fromarray(health_overlay)
+
+def _risk_level(confidence):
+    """Bucket a confidence percentage into a High / Medium / Low risk level"""
+    return _RISK_LEVELS[bisect.bisect_right(_RISK_CUTS, confidence)]
 
 def generate_detailed_report(results, image_info):
     """Generate comprehensive crop health report"""
+    # Cost-benefit estimates drawn in one batched call (inclusive bounds)
+    treatment_cost, yield_loss, roi, break_even = _RNG.integers(_COST_LOWS, _COST_HIGHS, endpoint=True)
+    risk_level = _risk_level(results['confidence'])
+    
     report = {
         "report_metadata": {
             "title": "Crop Health Analysis Report",
@@ -224,22 +519,17 @@ def generate_detailed_report(results, image_info):
             "primary_diagnosis": results['overall_health'],
             "confidence_level": f"{results['confidence']:.1f}%",
             "severity_level": results['severity_level'],
-            "risk_assessment": "High" if results['confidence'] < 70 else "Medium" if results['confidence'] < 90 else "Low",
+            "risk_assessment": risk_level,
             "key_findings": [
                 f"Primary diagnosis: {results['overall_health']}",
                 f"Confidence level: {results['confidence']:.1f}%",
                 f"Severity: {results['severity_level']}",
-                f"Risk level: {'High' if results['confidence'] < 70 else 'Medium' if results['confidence'] < 90 else 'Low'}"
+                f"Risk level: {risk_level}"
             ]
         },
         "risk_assessment": {
-            "overall_risk": "High" if results['confidence'] < 70 else "Medium" if results['confidence'] < 90 else "Low",
-            "risk_factors": {
-                "Nutrient Deficiency": 85 if "deficiency" in results['overall_health'].lower() else 20,
-                "Crop Stress": 70 if results['severity_level'] == "High" else 40,
-                "Yield Impact": 60 if results['severity_level'] == "High" else 30,
-                "Economic Loss": 50 if results['severity_level'] == "High" else 25
-            },
+            "overall_risk": risk_level,
+            "risk_factors": dict(_RISK_TABLE["deficiency" in results['overall_health'].lower(), results['severity_level']]),
             "mitigation_priority": "Immediate" if results['severity_level'] == "High" else "Short-term"
         },
         "timeline_recommendations": {
@@ -260,10 +550,10 @@ def generate_detailed_report(results, image_info):
             ]
         },
         "cost_benefit_analysis": {
-            "estimated_treatment_cost": f"₹{random.randint(2000, 8000)} per hectare",
-            "potential_yield_loss": f"{random.randint(15, 40)}% without treatment",
-            "roi_estimate": f"{random.randint(200, 500)}% return on investment",
-            "break_even_period": f"{random.randint(2, 6)} months"
+            "estimated_treatment_cost": f"₹{treatment_cost} per hectare",
+            "potential_yield_loss": f"{yield_loss}% without treatment",
+            "roi_estimate": f"{roi}% return on investment",
+            "break_even_period": f"{break_even} months"
         },
         "action_checklist": [
             "✓ Identify specific nutrient deficiency",
@@ -290,24 +580,299 @@ def generate_detailed_report(results, image_info):
             "analysis_method": "Digital Image Processing + AI Classification",
             "model_confidence": f"{results['confidence']:.1f}%",
             "image_quality": "High" if image_info.get('size', 0) > 100000 else "Medium",
-            "processing_time": f"{random.uniform(2.5, 5.0):.1f} seconds"
+            "processing_time": f"{_RNG.uniform(2.5, 5.0):.1f} seconds"
         }
     }
     
     return report
 
+def _dump_report(report):
+    """Serialize a report dict to indented JSON bytes (orjson when available)"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(report, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY, default=str)
+    return json.dumps(report, indent=2, default=str).encode("utf-8")
+
+# Results fields the report text is derived from (the cache key of the report payload)
+_REPORT_FIELDS = ('overall_health', 'confidence', 'severity_level')
+
+@st.cache_resource
+def _pdf_executor():
+    """Background threads for PDF rendering, shared across reruns and sessions"""
+    return ThreadPoolExecutor(max_workers=2)
+
+def _report_downloads(payload_key, results, image_info, report_json):
+    """Both download payloads for one analysis: {"json": bytes, "pdf": future of a PDF buffer}
+
+    Built once per analysis and kept in session_state; the PDF starts rendering
+    in the background immediately.
+    """
+    pending = st.session_state.get('crop_health_downloads')
+    if pending is None or pending[0] != payload_key:
+        # Imported on first report render: reportlab is heavy and unused on a bare page load
+        from modules.pdf_generator import PDFReportGenerator
+        future = _pdf_executor().submit(
+            PDFReportGenerator().create_crop_health_pdf,
+            dict(results),
+            dict(image_info)
+        )
+        pending = (payload_key, {"json": report_json, "pdf": future})
+        st.session_state.crop_health_downloads = pending
+    return pending[1]
+
+# Report sections shown as raw JSON in the Report tab
+_JSON_SECTIONS = ('executive_summary', 'risk_assessment', 'timeline_recommendations', 'cost_benefit_analysis')
+
+@st.cache_data(show_spinner=False)
+def _build_report_payload(report_values, image_info_items):
+    """Build the report once per analysis and return it with its JSON bytes and per-section JSON text"""
+    report = generate_detailed_report(dict(zip(_REPORT_FIELDS, report_values)), dict(image_info_items))
+    section_json = {name: _dump_report(report[name]).decode("utf-8") for name in _JSON_SECTIONS}
+    return report, _dump_report(report), section_json
+
+@st.fragment
+def _render_overview_tab():
+    """Overview tab: key metrics, health overlay and distribution charts"""
+    results = st.session_state.crop_health_results
+    prediction = results['overall_health']
+    confidence = results['confidence']
+    severity_level = results['severity_level']
+    advisory = results['advisory']
+    predictions = results['all_predictions']
+    deficiency_zones = results['deficiency_zones']
+    health_map = results['health_map']
+    health_overlay = results['health_overlay']
+    
+    st.markdown("### 📈 Analysis Results")
+    
+    # Key metrics (one grid block instead of four columns)
+    risk_level = _risk_level(confidence)
+    risk_color = _RISK_COLORS[risk_level]
+    cells = (
+        _METRIC_TEMPLATE.format(
+            heading=f'<h3 style="color: #2E8B57;">{advisory["emoji"]}</h3>',
+            color="#2E8B57", value=prediction, label="Primary Diagnosis"
+        ),
+        _METRIC_TEMPLATE.format(heading="", color="#228B22", value=f"{confidence:.1f}%", label="Confidence Level"),
+        _METRIC_TEMPLATE.format(heading="", color=risk_color, value=risk_level, label="Risk Level"),
+        _METRIC_TEMPLATE.format(heading="", color="#FF6B6B", value=severity_level, label="Severity Level")
+    )
+    st.markdown(_METRICS_ROW_TEMPLATE.format(count=len(cells), cells="".join(cells)), unsafe_allow_html=True)
+    
+    # Multi-Method Analysis Visualization
+    st.markdown("### 🔬 Multi-Method Analysis Results")
+    
+    # Show analysis methods side by side
+    col1, col2 = st.columns(2)
+    with col1:
+        st.image(health_overlay, caption="Health Overlay Visualization", use_column_width=True)
+    with col2:
+        st.plotly_chart(_cached_confidence_chart(tuple(predictions.items())), use_container_width=True, key="confidence_chart_overview")
+    
+    # Health distribution heatmap
+    st.plotly_chart(_cached_crop_health_heatmap(health_map), use_container_width=True, key="health_heatmap_overview")
+    
+    # Nutrient deficiency distribution
+    st.plotly_chart(_cached_nutrient_deficiency_chart(tuple(deficiency_zones.items())), use_container_width=True, key="nutrient_chart_overview")
+
+@st.fragment
+def _render_detailed_tab():
+    """Detailed Analysis tab: diagnosis, method breakdown, treatments and risk"""
+    results = st.session_state.crop_health_results
+    prediction = results['overall_health']
+    severity_level = results['severity_level']
+    advisory = results['advisory']
+    treatment_recommendations = results['treatment_recommendations']
+    method_scores = results['method_scores']
+    
+    st.markdown("### 🔍 Detailed Analysis")
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        st.markdown("#### 🩺 Diagnosis Details")
+        
+        # Diagnosis details
+        st.markdown(_INFO_BOX_TEMPLATE.format(
+            emoji=advisory['emoji'], title=prediction, description=advisory['description']
+        ), unsafe_allow_html=True)
+        
+        # Multi-method analysis breakdown
+        st.markdown("#### 🔬 Analysis Method Breakdown")
+        method_data = dict(zip(_METHOD_NAMES, method_scores[:, _KEYS.index(prediction)].tolist()))
+        
+        fig_methods = _cached_method_contributions_chart(tuple(method_data.items()))
+        st.plotly_chart(fig_methods, use_container_width=True, key="methods_chart_detailed")
+    
+    with col2:
+        st.markdown("#### 🛠️ Treatment Recommendations")
+        
+        # Remedial actions
+        st.markdown("**Immediate Actions:**")
+        st.markdown("\n\n".join(f"**{i}.** {action}" for i, action in enumerate(advisory['remedial_actions'], 1)))
+        
+        # Preventive measures
+        st.markdown("**Preventive Measures:**")
+        st.markdown("\n\n".join(f"**{i}.** {measure}" for i, measure in enumerate(advisory['preventive_measures'], 1)))
+        
+        # Treatment recommendations chart
+        fig_treatment = _cached_treatment_recommendations_chart(
+            tuple((name, rec['priority']) for name, rec in treatment_recommendations.items())
+        )
+        st.plotly_chart(fig_treatment, use_container_width=True, key="treatment_chart_detailed")
+    
+    # Risk assessment chart
+    risk_factors = _RISK_TABLE["deficiency" in prediction.lower(), severity_level]
+    st.plotly_chart(_cached_risk_assessment_chart(tuple(risk_factors.items())), use_container_width=True, key="risk_chart_detailed")
+    
+    # Additional metrics
+    recovery_days, success_rate = _expected_outcomes(prediction, severity_level, results['confidence'])
+    st.markdown(_metrics_html((
+        ("Severity Level", severity_level),
+        ("Treatment Priority", _TREATMENT_PRIORITY.get(severity_level, "Medium")),
+        ("Expected Recovery", f"{recovery_days} days"),
+        ("Success Rate", f"{success_rate}%")
+    )), unsafe_allow_html=True)
+
+@st.fragment
+def _render_report_tab():
+    """Report tab: report sections and JSON/PDF downloads"""
+    results = st.session_state.crop_health_results
+    image_info = results['image_info']
+    
+    st.markdown("### 📄 Comprehensive Report")
+    
+    # Generate report (cached: tab switches and chat messages reuse the same payload)
+    payload_key = (tuple(results[field] for field in _REPORT_FIELDS), tuple(image_info.items()))
+    report, report_json, section_json = _build_report_payload(*payload_key)
+    
+    # PDF renders off the script thread while the sections below are drawn
+    downloads = _report_downloads((results['analysis_ts'], payload_key), results, image_info, report_json)
+    
+    # Executive Summary
+    st.markdown("#### 📊 Executive Summary")
+    
+    st.markdown(_metrics_html((
+        ("Primary Diagnosis", results['overall_health']),
+        ("Confidence Score", f"{results['confidence']:.1f}%"),
+        ("Severity Level", results['severity_level']),
+        ("Risk Assessment", _risk_level(results['confidence']))
+    )), unsafe_allow_html=True)
+    
+    # Display report sections
+    st.markdown("#### 📋 Detailed Findings")
+    st.code(section_json['executive_summary'], language="json")
+    
+    st.markdown("#### ⚠️ Risk Assessment")
+    st.code(section_json['risk_assessment'], language="json")
+    
+    st.markdown("#### ⏰ Timeline Recommendations")
+    st.code(section_json['timeline_recommendations'], language="json")
+    
+    st.markdown("#### 💰 Cost-Benefit Analysis")
+    st.code(section_json['cost_benefit_analysis'], language="json")
+    
+    st.markdown("#### ✅ Action Checklist")
+    st.markdown("\n\n".join(report['action_checklist']))
+    
+    st.markdown("#### 🔄 Follow-up Actions")
+    st.markdown("\n\n".join(f"• {action}" for action in report['follow_up_actions']))
+    
+    st.markdown("#### 🛡️ Prevention Strategies")
+    st.markdown("\n\n".join(f"• {strategy}" for strategy in report['prevention_strategies']))
+    
+    # Download report
+    st.markdown("---")
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        st.download_button(
+            label="📄 Download JSON Report",
+            data=downloads["json"],
+            file_name=f"crop_health_report_{results['analysis_ts']}.json",
+            mime="application/json",
+            use_container_width=True,
+            key="download_json_report_main"
+        )
+    
+    with col2:
+        try:
+            pdf_future = downloads["pdf"]
+            if not pdf_future.done():
+                with st.spinner("📄 Preparing PDF report..."):
+                    pdf_future.result()
+            pdf_buffer = pdf_future.result()
+            
+            from modules.pdf_generator import create_download_button
+            create_download_button(
+                pdf_buffer,
+                f"crop_health_report_{results['analysis_ts']}.pdf",
+                "📄 Download PDF Report",
+                key="download_pdf_report_main"
+            )
+        except Exception as e:
+            # Forget the failed render so the next rerun submits a fresh one
+            st.session_state.pop('crop_health_downloads', None)
+            st.error(f"❌ PDF generation error: {e}")
+            st.info("💡 Please try again or contact support if the issue persists.")
+
+@st.fragment
+def _render_chat_tab():
+    """Chat Assistant tab: chatbot seeded with the analysis context"""
+    results = st.session_state.crop_health_results
+    
+    st.markdown("### 💬 Chat with Crop Health Expert")
+    analysis_context = f"Crop Health: {results['overall_health']}, Confidence: {results['confidence']:.1f}%, Severity: {results['severity_level']}"
+    
+    # Enhanced Crop Health Chatbot with Groq API - WITH UNIQUE KEY
+    st.markdown(_CHATBOT_BANNER_HTML, unsafe_allow_html=True)
+    
+    # Display chatbot with unique key for analysis tab
+    if CHATBOT_AVAILABLE:
+        try:
+            # History lives in session_state per analysis context, so switching back restores it
+            context_key = zlib.crc32(analysis_context.encode("utf-8"))
+            chatbot.display_chat_interface("crop_health", analysis_context, unique_key=f"crop_health_analysis_chat_{context_key}", client=_get_chatbot_client())
+        except Exception as e:
+            st.error(f"❌ Chatbot error: {str(e)}")
+            st.info("💡 Please try refreshing the page or contact support if the issue persists.")
+    else:
+        st.warning("⚠️ Chatbot is currently unavailable. Please refresh the page.")
+
+@st.fragment
+def _render_landing_chat():
+    """General crop health chatbot on the starting page (messages rerun only this fragment)"""
+    if CHATBOT_AVAILABLE:
+        try:
+            chatbot.display_chat_interface("crop_health", None, unique_key="crop_health_main_chat", client=_get_chatbot_client())
+        except Exception as e:
+            st.error(f"❌ Chatbot initialization error: {str(e)}")
+            st.info("💡 Please refresh the page or contact support if the issue persists.")
+    else:
+        st.warning("⚠️ Chatbot is currently unavailable. Please refresh the page.")
+
+def render_results_tabs():
+    """Render the analysis tabs from results persisted in st.session_state
+
+    Each tab is its own fragment, so a widget inside one tab (chat input, download
+    button) reruns only that tab instead of the whole page and every chart.
+    """
+    # Display results in tabs (4 comprehensive tabs like Irrigation)
+    tab1, tab2, tab3, tab4 = st.tabs(["📊 Overview", "🔍 Detailed Analysis", "📄 Report", "💬 Chat Assistant"])
+    
+    with tab1:
+        _render_overview_tab()
+    
+    with tab2:
+        _render_detailed_tab()
+    
+    with tab3:
+        _render_report_tab()
+    
+    with tab4:
+        _render_chat_tab()
+
 def main():
-    st.markdown("""
-    <div style="text-align: center; padding: 2rem 0;">
-        <h1 style="color: #2E8B57; font-size: 3rem; margin-bottom: 1rem;">
-            🌿 Crop Health & Monitoring System
-        </h1>
-        <p style="color: #228B22; font-size: 1.2rem; max-width: 800px; margin: 0 auto;">
-            Advanced AI-powered crop health diagnosis and nutrient deficiency detection for Indian farmers.
-            Upload crop images to get detailed analysis, confidence metrics, and expert recommendations.
-        </p>
-    </div>
-    """, unsafe_allow_html=True)
+    st.markdown(_HEADER_HTML, unsafe_allow_html=True)
     
     # Quick Actions Section (like Irrigation)
     st.markdown("### ⚡ Quick Actions")
@@ -331,28 +896,8 @@ def main():
     
     # Chatbot on Starting Page (like Irrigation) - WITH UNIQUE KEY
     st.markdown("### 💬 Crop Health Expert Assistant")
-    st.markdown("""
-    <div style="background: linear-gradient(135deg, #f0fff0 0%, #e8f5e8 100%); 
-                padding: 1.5rem; border-radius: 15px; margin: 1rem 0; 
-                border: 2px solid #32CD32; box-shadow: 0 8px 25px rgba(0,0,0,0.1);">
-        <h3 style="color: #228B22; margin-bottom: 1rem; text-align: center;">
-            🌿 Crop Health Specialist Chatbot
-        </h3>
-        <p style="text-align: center; color: #666; margin-bottom: 1rem;">
-            Powered by Groq AI - Specialized in crop health, nutrient deficiency, and plant pathology
-        </p>
-    </div>
-    """, unsafe_allow_html=True)
-    
-    # Display chatbot interface on starting page with unique key
-    if CHATBOT_AVAILABLE:
-        try:
-            chatbot.display_chat_interface("crop_health", None, unique_key="crop_health_main_chat")
-        except Exception as e:
-            st.error(f"❌ Chatbot initialization error: {str(e)}")
-            st.info("💡 Please refresh the page or contact support if the issue persists.")
-    else:
-        st.warning("⚠️ Chatbot is currently unavailable. Please refresh the page.")
+    st.markdown(_CHATBOT_BANNER_HTML, unsafe_allow_html=True)
+    _render_landing_chat()
     
     st.markdown("---")
     
@@ -366,7 +911,12 @@ def main():
     
     if uploaded_file is not None:
         # Display image information
-        image = Image.open(uploaded_file)
+        # Decode once into an RGB array (IMREAD_COLOR also drops alpha / expands grayscale)
+        image = decode_uploaded_image(uploaded_file)
+        if image is None:
+            st.error("❌ Could not decode the uploaded image. Please upload a valid JPG, PNG or TIFF file.")
+            return
+        image_height, image_width = image.shape[:2]
         st.image(image, caption="Uploaded Crop Image", use_column_width=True)
         
         # Image information
@@ -374,64 +924,29 @@ def main():
         with col1:
             st.info(f"**File Size:** {uploaded_file.size / 1024:.1f} KB")
         with col2:
-            st.info(f"**Dimensions:** {image.size[0]} × {image.size[1]}")
+            st.info(f"**Dimensions:** {image_width} × {image_height}")
         with col3:
             st.info(f"**Format:** {uploaded_file.type}")
         
+        # Downsampled copy for analysis, decoded once per upload
+        if st.session_state.get('crop_health_image_id') != uploaded_file.file_id:
+            st.session_state.crop_health_image_small = downsample_for_analysis(image)
+            st.session_state.crop_health_image_id = uploaded_file.file_id
+        image_small = st.session_state.crop_health_image_small
+        
         # Analysis button
         if st.button("🔍 Analyze Crop Health", type="primary", use_container_width=True, key="analyze_crop_health_main"):
             with st.spinner("🤖 Running advanced multi-method crop health analysis..."):
                 try:
-                    # Multi-method crop health analysis
-                    # Method 1: Color-based analysis
-                    color_predictions = {
-                        "Healthy": random.uniform(20, 40),
-                        "Nitrogen Deficiency": random.uniform(15, 35),
-                        "Potassium Deficiency": random.uniform(10, 25),
-                        "Phosphorus Deficiency": random.uniform(5, 20),
-                        "General Stress": random.uniform(5, 15)
-                    }
-                    
-                    # Method 2: Texture-based analysis
-                    texture_predictions = {
-                        "Healthy": random.uniform(18, 38),
-                        "Nitrogen Deficiency": random.uniform(16, 36),
-                        "Potassium Deficiency": random.uniform(12, 28),
-                        "Phosphorus Deficiency": random.uniform(6, 22),
-                        "General Stress": random.uniform(4, 16)
-                    }
-                    
-                    # Method 3: Shape-based analysis
-                    shape_predictions = {
-                        "Healthy": random.uniform(22, 42),
-                        "Nitrogen Deficiency": random.uniform(14, 34),
-                        "Potassium Deficiency": random.uniform(8, 24),
-                        "Phosphorus Deficiency": random.uniform(4, 18),
-                        "General Stress": random.uniform(6, 18)
-                    }
-                    
-                    # Method 4: Pattern-based analysis
-                    pattern_predictions = {
-                        "Healthy": random.uniform(19, 39),
-                        "Nitrogen Deficiency": random.uniform(17, 37),
-                        "Potassium Deficiency": random.uniform(11, 27),
-                        "Phosphorus Deficiency": random.uniform(5, 21),
-                        "General Stress": random.uniform(5, 17)
-                    }
+                    # Multi-method crop health analysis: one vectorized draw for
+                    # color, texture, shape and pattern methods (rows) x diagnoses (columns)
+                    method_scores = _RNG.uniform(_METHOD_LOWS, _METHOD_HIGHS)
                     
                     # Composite analysis with weighted combination
-                    composite_predictions = {}
-                    for key in color_predictions.keys():
-                        composite_predictions[key] = (
-                            color_predictions[key] * 0.4 +
-                            texture_predictions[key] * 0.3 +
-                            shape_predictions[key] * 0.2 +
-                            pattern_predictions[key] * 0.1
-                        )
+                    composite = _WEIGHTS @ method_scores
                     
                     # Normalize composite predictions
-                    total = sum(composite_predictions.values())
-                    predictions = {k: (v/total)*100 for k, v in composite_predictions.items()}
+                    predictions = dict(zip(_KEYS, (composite / composite.sum() * 100).tolist()))
                     
                     # Get primary prediction
                     prediction = max(predictions, key=predictions.get)
@@ -439,66 +954,24 @@ def main():
                     
                     # Create health maps for visualization
                     try:
-                        health_map = create_crop_health_map(image.size, confidence)
-                        health_overlay = overlay_health_map(image, health_map)
+                        health_map = create_crop_health_map((image_small.shape[1], image_small.shape[0]), confidence)
+                        health_overlay = overlay_health_map(image_small, health_map)
                     except Exception as e:
                         st.warning(f"⚠️ Health overlay generation failed: {e}")
                         # Create a simple fallback overlay
-                        health_map = np.random.uniform(0.3, 0.8, (512, 512))
-                        health_overlay = image  # Use original image as fallback
+                        health_map = _RNG.integers(77, 204, image_small.shape[:2], dtype=np.uint8)
+                        health_overlay = image_small  # Use original image as fallback
                     
                     # Classify deficiency zones
-                    deficiency_zones = {
-                        "Healthy": predictions.get("Healthy", 0),
-                        "Nitrogen Deficient": predictions.get("Nitrogen Deficiency", 0),
-                        "Potassium Deficient": predictions.get("Potassium Deficiency", 0),
-                        "Phosphorus Deficient": predictions.get("Phosphorus Deficiency", 0),
-                        "General Stress": predictions.get("General Stress", 0)
-                    }
+                    deficiency_zones = {zone: predictions.get(key, 0) for zone, key in _ZONE_KEY_MAP.items()}
                     
                     # Generate treatment recommendations
                     treatment_recommendations = {
-                        "Nitrogen Treatment": {"priority": predictions.get("Nitrogen Deficiency", 0) * 0.8},
-                        "Potassium Treatment": {"priority": predictions.get("Potassium Deficiency", 0) * 0.8},
-                        "Phosphorus Treatment": {"priority": predictions.get("Phosphorus Deficiency", 0) * 0.8},
-                        "General Care": {"priority": predictions.get("General Stress", 0) * 0.6}
+                        treatment: {"priority": predictions.get(key, 0) * weight}
+                        for treatment, (key, weight) in _TREATMENT_WEIGHTS.items()
                     }
                 
-                    # Generate advisory information
-                    advisory_info = {
-                        "Healthy": {
-                            "description": "Your crop appears to be in good health with no significant nutrient deficiencies detected.",
-                            "remedial_actions": ["Continue current management practices", "Monitor regularly for any changes"],
-                            "preventive_measures": ["Maintain soil fertility", "Regular crop monitoring"],
-                            "emoji": "✅"
-                        },
-                        "Nitrogen Deficiency": {
-                            "description": "Yellowing of older leaves indicates nitrogen deficiency. This affects protein synthesis and overall plant growth.",
-                            "remedial_actions": ["Apply urea (46-0-0) at 50-100 kg/hectare", "Use ammonium sulfate for quick response", "Foliar spray with urea 2% solution"],
-                            "preventive_measures": ["Regular soil testing", "Balanced fertilizer application", "Organic matter addition"],
-                            "emoji": "⚠️"
-                        },
-                        "Potassium Deficiency": {
-                            "description": "Brown scorching on leaf edges and weak stems indicate potassium deficiency affecting water regulation.",
-                            "remedial_actions": ["Apply muriate of potash (0-0-60) at 40-60 kg/hectare", "Use potassium sulfate for sensitive crops", "Foliar application of potassium nitrate"],
-                            "preventive_measures": ["Maintain soil potassium levels", "Crop rotation with legumes", "Avoid excessive nitrogen"],
-                            "emoji": "🔴"
-                        },
-                        "Phosphorus Deficiency": {
-                            "description": "Purple/reddish leaves and delayed flowering indicate phosphorus deficiency affecting energy transfer.",
-                            "remedial_actions": ["Apply DAP (18-46-0) or SSP (0-20-0) at 50-75 kg/hectare", "Use rock phosphate for long-term supply", "Foliar spray with phosphoric acid"],
-                            "preventive_measures": ["Soil pH management (6.0-7.0)", "Organic phosphorus sources", "Proper placement of phosphorus"],
-                            "emoji": "🟣"
-                        },
-                        "General Stress": {
-                            "description": "Multiple stress factors affecting crop health including environmental and nutritional stress.",
-                            "remedial_actions": ["Comprehensive soil analysis", "Balanced nutrient application", "Environmental stress management"],
-                            "preventive_measures": ["Integrated crop management", "Stress-resistant varieties", "Proper irrigation management"],
-                            "emoji": "🌡️"
-                        }
-                    }
-                    
-                    advisory = advisory_info[prediction]
+                    advisory = _ADVISORY_INFO[prediction]
                     
                     # Determine severity level
                     if confidence > 80:
@@ -508,7 +981,7 @@ def main():
                     else:
                         severity_level = "High"
                     
-                    # Store results
+                    # Store results (tabs are rendered from session_state below)
                     results = {
                         'overall_health': prediction,
                         'confidence': confidence,
@@ -518,264 +991,31 @@ def main():
                         'deficiency_zones': deficiency_zones,
                         'treatment_recommendations': treatment_recommendations,
                         'health_map': health_map,
-                        'health_overlay': health_overlay
-                    }
-                    
-                    st.session_state.crop_health_results = results
-                    
-                    # Display results in tabs (4 comprehensive tabs like Irrigation)
-                    tab1, tab2, tab3, tab4 = st.tabs(["📊 Overview", "🔍 Detailed Analysis", "📄 Report", "💬 Chat Assistant"])
-                    
-                    with tab1:
-                        st.markdown("### 📈 Analysis Results")
-                        
-                        # Key metrics
-                        col1, col2, col3, col4 = st.columns(4)
-                        
-                        with col1:
-                            st.markdown(f"""
-                            <div class="metric-container">
-                                <h3 style="color: #2E8B57;">{advisory['emoji']}</h3>
-                                <h2 style="color: #2E8B57;">{prediction}</h2>
-                                <p>Primary Diagnosis</p>
-                            </div>
-                            """, unsafe_allow_html=True)
-                        
-                        with col2:
-                            st.markdown(f"""
-                            <div class="metric-container">
-                                <h2 style="color: #228B22;">{confidence:.1f}%</h2>
-                                <p>Confidence Level</p>
-                            </div>
-                            """, unsafe_allow_html=True)
-                        
-                        with col3:
-                            risk_level = "High" if confidence < 70 else "Medium" if confidence < 90 else "Low"
-                            risk_color = "#FF6B6B" if risk_level == "High" else "#FFA500" if risk_level == "Medium" else "#32CD32"
-                            st.markdown(f"""
-                            <div class="metric-container">
-                                <h2 style="color: {risk_color};">{risk_level}</h2>
-                                <p>Risk Level</p>
-                            </div>
-                            """, unsafe_allow_html=True)
-                        
-                        with col4:
-                            st.markdown(f"""
-                            <div class="metric-container">
-                                <h2 style="color: #FF6B6B;">{severity_level}</h2>
-                                <p>Severity Level</p>
-                            </div>
-                            """, unsafe_allow_html=True)
-                        
-                        # Multi-Method Analysis Visualization
-                        st.markdown("### 🔬 Multi-Method Analysis Results")
-                        
-                        # Show analysis methods side by side
-                        col1, col2 = st.columns(2)
-                        with col1:
-                            st.image(health_overlay, caption="Health Overlay Visualization", use_column_width=True)
-                        with col2:
-                            st.plotly_chart(create_confidence_chart(predictions, predictions), use_container_width=True, key="confidence_chart_overview")
-                        
-                        # Health distribution heatmap
-                        st.plotly_chart(create_crop_health_heatmap(health_map), use_container_width=True, key="health_heatmap_overview")
-                        
-                        # Nutrient deficiency distribution
-                        st.plotly_chart(create_nutrient_deficiency_chart(deficiency_zones), use_container_width=True, key="nutrient_chart_overview")
-                    
-                    with tab2:
-                        st.markdown("### 🔍 Detailed Analysis")
-                        
-                        col1, col2 = st.columns(2)
-                        
-                        with col1:
-                            st.markdown("#### 🩺 Diagnosis Details")
-                            
-                            # Diagnosis details
-                            st.markdown(f"""
-                            <div class="info-box">
-                                <h3>{advisory['emoji']} {prediction}</h3>
-                                <p>{advisory['description']}</p>
-                            </div>
-                            """, unsafe_allow_html=True)
-                            
-                            # Multi-method analysis breakdown
-                            st.markdown("#### 🔬 Analysis Method Breakdown")
-                            method_data = {
-                                "Color Analysis": color_predictions[prediction],
-                                "Texture Analysis": texture_predictions[prediction],
-                                "Shape Analysis": shape_predictions[prediction],
-                                "Pattern Analysis": pattern_predictions[prediction]
-                            }
-                            
-                            fig_methods = go.Figure(data=[go.Bar(
-                                x=list(method_data.keys()),
-                                y=list(method_data.values()),
-                                marker_color=['#FF6B6B', '#FFA500', '#32CD32', '#8B4513'],
-                                text=[f"{v:.1f}%" for v in method_data.values()],
-                                textposition='auto',
-                            )])
-                            
-                            fig_methods.update_layout(
-                                title="Analysis Method Contributions",
-                                xaxis_title="Analysis Method",
-                                yaxis_title="Confidence (%)",
-                                height=400
-                            )
-                            
-                            st.plotly_chart(fig_methods, use_container_width=True, key="methods_chart_detailed")
-                        
-                        with col2:
-                            st.markdown("#### 🛠️ Treatment Recommendations")
-                            
-                            # Remedial actions
-                            st.markdown("**Immediate Actions:**")
-                            for i, action in enumerate(advisory['remedial_actions'], 1):
-                                st.markdown(f"**{i}.** {action}")
-                            
-                            # Preventive measures
-                            st.markdown("**Preventive Measures:**")
-                            for i, measure in enumerate(advisory['preventive_measures'], 1):
-                                st.markdown(f"**{i}.** {measure}")
-                            
-                            # Treatment recommendations chart
-                            fig_treatment = create_treatment_recommendations_chart(treatment_recommendations)
-                            st.plotly_chart(fig_treatment, use_container_width=True, key="treatment_chart_detailed")
-                        
-                        # Risk assessment chart
-                        risk_factors = {
-                            "Nutrient Deficiency": 85 if "deficiency" in prediction.lower() else 20,
-                            "Crop Stress": 70 if severity_level == "High" else 40,
-                            "Yield Impact": 60 if severity_level == "High" else 30,
-                            "Economic Loss": 50 if severity_level == "High" else 25
-                        }
-                        st.plotly_chart(create_risk_assessment_chart(risk_factors), use_container_width=True, key="risk_chart_detailed")
-                        
-                        # Additional metrics
-                        col1, col2, col3, col4 = st.columns(4)
-                        with col1:
-                            st.metric("Severity Level", severity_level)
-                        with col2:
-                            st.metric("Treatment Priority", "High" if severity_level == "High" else "Medium")
-                        with col3:
-                            st.metric("Expected Recovery", f"{random.randint(7, 21)} days")
-                        with col4:
-                            st.metric("Success Rate", f"{random.randint(75, 95)}%")
-                    
-                    with tab3:
-                        st.markdown("### 📄 Comprehensive Report")
-                        
-                        # Generate report
-                        image_info = {
+                        'health_overlay': health_overlay,
+                        'method_scores': method_scores,
+                        'image_id': uploaded_file.file_id,
+                        'analysis_ts': datetime.datetime.now().strftime('%Y%m%d_%H%M%S'),
+                        'image_info': {
                             'filename': uploaded_file.name,
                             'size': uploaded_file.size,
-                            'dimensions': f"{image.size[0]}x{image.size[1]}"
+                            'dimensions': f"{image_width}x{image_height}"
                         }
-                        
-                        report = generate_detailed_report(results, image_info)
-                        
-                        # Executive Summary
-                        st.markdown("#### 📊 Executive Summary")
-                        
-                        col1, col2, col3, col4 = st.columns(4)
-                        with col1:
-                            st.metric("Primary Diagnosis", results['overall_health'])
-                        with col2:
-                            st.metric("Confidence Score", f"{results['confidence']:.1f}%")
-                        with col3:
-                            st.metric("Severity Level", results['severity_level'])
-                        with col4:
-                            st.metric("Risk Assessment", "High" if results['confidence'] < 70 else "Medium" if results['confidence'] < 90 else "Low")
-                        
-                        # Display report sections
-                        st.markdown("#### 📋 Detailed Findings")
-                        st.json(report['executive_summary'])
-                        
-                        st.markdown("#### ⚠️ Risk Assessment")
-                        st.json(report['risk_assessment'])
-                        
-                        st.markdown("#### ⏰ Timeline Recommendations")
-                        st.json(report['timeline_recommendations'])
-                        
-                        st.markdown("#### 💰 Cost-Benefit Analysis")
-                        st.json(report['cost_benefit_analysis'])
-                        
-                        st.markdown("#### ✅ Action Checklist")
-                        for item in report['action_checklist']:
-                            st.markdown(item)
-                        
-                        st.markdown("#### 🔄 Follow-up Actions")
-                        for action in report['follow_up_actions']:
-                            st.markdown(f"• {action}")
-                        
-                        st.markdown("#### 🛡️ Prevention Strategies")
-                        for strategy in report['prevention_strategies']:
-                            st.markdown(f"• {strategy}")
-                        
-                        # Download report
-                        st.markdown("---")
-                        col1, col2 = st.columns(2)
-                        
-                        with col1:
-                            report_json = json.dumps(report, indent=2, default=str)
-                            st.download_button(
-                                label="📄 Download JSON Report",
-                                data=report_json,
-                                file_name=f"crop_health_report_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
-                                mime="application/json",
-                                use_container_width=True,
-                                key="download_json_report_main"
-                            )
-                        
-                        with col2:
-                            try:
-                                pdf_generator = PDFReportGenerator()
-                                pdf_buffer = pdf_generator.create_crop_health_pdf(results, image_info)
-                                
-                                create_download_button(
-                                    pdf_buffer,
-                                    f"crop_health_report_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf",
-                                    "📄 Download PDF Report",
-                                    key="download_pdf_report_main"
-                                )
-                            except Exception as e:
-                                st.error(f"❌ PDF generation error: {e}")
-                                st.info("💡 Please try again or contact support if the issue persists.")
+                    }
                     
-                    with tab4:
-                        st.markdown("### 💬 Chat with Crop Health Expert")
-                        analysis_context = f"Crop Health: {results['overall_health']}, Confidence: {results['confidence']:.1f}%, Severity: {results['severity_level']}"
-                        
-                        # Debug information
-                        st.info(f"🔍 Debug: Analysis context = {analysis_context}")
-                        
-                        # Enhanced Crop Health Chatbot with Groq API - WITH UNIQUE KEY
-                        st.markdown("""
-                        <div style="background: linear-gradient(135deg, #f0fff0 0%, #e8f5e8 100%); 
-                                    padding: 1.5rem; border-radius: 15px; margin: 1rem 0; 
-                                    border: 2px solid #32CD32; box-shadow: 0 8px 25px rgba(0,0,0,0.1);">
-                            <h3 style="color: #228B22; margin-bottom: 1rem; text-align: center;">
-                                🌿 Crop Health Specialist Chatbot
-                            </h3>
-                            <p style="text-align: center; color: #666; margin-bottom: 1rem;">
-                                Powered by Groq AI - Specialized in crop health, nutrient deficiency, and plant pathology
-                            </p>
-                        </div>
-                        """, unsafe_allow_html=True)
-                        
-                        # Display chatbot with unique key for analysis tab
-                        if CHATBOT_AVAILABLE:
-                            try:
-                                chatbot.display_chat_interface("crop_health", analysis_context, unique_key="crop_health_analysis_chat")
-                            except Exception as e:
-                                st.error(f"❌ Chatbot error: {str(e)}")
-                                st.info("💡 Please try refreshing the page or contact support if the issue persists.")
-                        else:
-                            st.warning("⚠️ Chatbot is currently unavailable. Please refresh the page.")
+                    st.session_state.crop_health_results = results
                 
                 except Exception as e:
                     st.error(f"Analysis failed: {str(e)}")
                     st.info("Please try uploading a different image or contact support.")
+        
+        # Render the last analysis of this upload on every rerun (e.g. after a chat message)
+        results = st.session_state.get('crop_health_results')
+        if results is not None and results['image_id'] == uploaded_file.file_id:
+            try:
+                render_results_tabs()
+            except Exception as e:
+                st.error(f"Analysis failed: {str(e)}")
+                st.info("Please try uploading a different image or contact support.")
     
     else:
         st.info("👆 Please upload a crop image to start the analysis.")
@@ -784,45 +1024,10 @@ def main():
         st.markdown("---")
         st.markdown("### 📊 Sample Analysis Preview")
         
-        col1, col2, col3 = st.columns(3)
-        
-        with col1:
-            st.markdown("""
-            <div class="sample-analysis">
-                <h4>🌿 Healthy Crop</h4>
-                <p>Confidence: 92.3%</p>
-                <p>Status: Optimal health</p>
-            </div>
-            """, unsafe_allow_html=True)
-        
-        with col2:
-            st.markdown("""
-            <div class="sample-analysis">
-                <h4>⚠️ Nitrogen Deficiency</h4>
-                <p>Confidence: 87.1%</p>
-                <p>Action: Apply urea</p>
-            </div>
-            """, unsafe_allow_html=True)
-        
-        with col3:
-            st.markdown("""
-            <div class="sample-analysis">
-                <h4>🔴 Potassium Deficiency</h4>
-                <p>Confidence: 83.5%</p>
-                <p>Action: Apply MOP</p>
-            </div>
-            """, unsafe_allow_html=True)
+        st.markdown(_SAMPLE_CARDS_HTML, unsafe_allow_html=True)
     
     # Footer
-    st.markdown("""
-    <div style="text-align: center; padding: 2rem; background: #2E8B57; color: white; border-radius: 10px; margin-top: 3rem;">
-        <h4>🌿 Krishi Sahayak - Crop Health & Monitoring</h4>
-        <p>Empowering Indian farmers with AI-driven crop health analysis</p>
-        <p style="font-size: 0.9rem; opacity: 0.8;">
-            Built with ❤️ for Indian Agriculture | Advanced AI Technology
-        </p>
-    </div>
-    """, unsafe_allow_html=True)
+    st.markdown(_FOOTER_HTML, unsafe_allow_html=True)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
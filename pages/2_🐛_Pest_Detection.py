@@ -1,21 +1,33 @@
 import streamlit as st
-import cv2
 import numpy as np
-import pandas as pd
-import plotly.graph_objects as go
-import plotly.express as px
-from PIL import Image, ImageDraw
+from PIL import Image, ImageDraw, ImageOps
 import json
 import datetime
+import time
 import io
 import base64
 from pathlib import Path
 import random
+from collections import Counter
 
 # Import modules
-from modules import preprocessing, model_inference, chatbot
 from config import CUSTOM_CSS, MODEL_CONFIGS
 
+# Import chatbot once with error handling (reused by the home page and the Chat Assistant tab)
+try:
+    from modules.enhanced_chatbot import create_chat_interface
+    from modules.chatbot import create_client
+    CHATBOT_AVAILABLE = True
+    CHATBOT_IMPORT_ERROR = None
+except ImportError as e:
+    CHATBOT_AVAILABLE = False
+    CHATBOT_IMPORT_ERROR = str(e)
+
+@st.cache_resource
+def _get_chatbot_client():
+    """Groq client shared across reruns and sessions (reuses HTTP connections)"""
+    return create_client()
+
 # Inject custom CSS
 st.markdown(CUSTOM_CSS, unsafe_allow_html=True)
 
@@ -26,22 +38,28 @@ st.set_page_config(
     layout="wide"
 )
 
-def create_pest_count_chart(detections):
-    """Create pest count visualization chart"""
-    if not detections:
+def count_pests(detections):
+    """Count detections per pest label as a sorted ((label, count), ...) tuple"""
+    return tuple(sorted(Counter(detection['label'] for detection in detections).items()))
+
+_PEST_COLORS = ('#FF6B6B', '#FFA500', '#32CD32', '#4ECDC4', '#45B7D1')
+
+@st.cache_data(show_spinner=False)
+def create_pest_count_chart(counts):
+    """Create pest count visualization chart from count_pests() output"""
+    if not counts:
         return None
     
-    pest_counts = {}
-    for detection in detections:
-        label = detection['label']
-        pest_counts[label] = pest_counts.get(label, 0) + 1
+    import plotly.graph_objects as go
+    
+    labels, values = zip(*counts)
     
     fig = go.Figure(data=[
         go.Bar(
-            x=list(pest_counts.keys()),
-            y=list(pest_counts.values()),
-            marker_color=['#FF6B6B', '#FFA500', '#32CD32', '#4ECDC4', '#45B7D1'][:len(pest_counts)],
-            text=list(pest_counts.values()),
+            x=labels,
+            y=values,
+            marker_color=_PEST_COLORS[:len(counts)],
+            text=values,
             textposition='auto',
         )
     ])
@@ -56,8 +74,11 @@ def create_pest_count_chart(detections):
     
     return fig
 
-def create_severity_chart(severity_data):
-    """Create severity level chart"""
+@st.cache_data(show_spinner=False)
+def create_severity_chart(severity_items):
+    """Create severity level chart from ((level, value), ...) items"""
+    import plotly.graph_objects as go
+    severity_data = dict(severity_items)
     fig = go.Figure(data=[
         go.Pie(
             labels=list(severity_data.keys()),
@@ -75,8 +96,80 @@ def create_severity_chart(severity_data):
     
     return fig
 
+# Pest classes produced by the (simulated) detector
+PEST_TYPES = ("Aphids", "Whiteflies", "Caterpillars", "Beetles", "Mites", "Thrips")
+
+# Reference information per pest class (shown in the Detailed Analysis tab)
+PEST_INFO = {
+    "Aphids": {
+        "description": "Small, soft-bodied insects that suck plant sap",
+        "lifecycle": "Reproduce rapidly, 7-10 day generation time",
+        "control_methods": ["Neem oil spray", "Insecticidal soap", "Beneficial insects"]
+    },
+    "Whiteflies": {
+        "description": "Small white insects that feed on plant sap",
+        "lifecycle": "Complete lifecycle in 3-4 weeks",
+        "control_methods": ["Yellow sticky traps", "Horticultural oil", "Biological control"]
+    },
+    "Caterpillars": {
+        "description": "Larval stage of moths and butterflies",
+        "lifecycle": "Feed voraciously for 2-4 weeks before pupation",
+        "control_methods": ["Bt (Bacillus thuringiensis)", "Hand picking", "Natural predators"]
+    },
+    "Beetles": {
+        "description": "Hard-shelled insects that chew on plant tissue",
+        "lifecycle": "Complete metamorphosis, 4-6 week lifecycle",
+        "control_methods": ["Pyrethrin sprays", "Crop rotation", "Trap crops"]
+    },
+    "Mites": {
+        "description": "Tiny arachnids that suck plant sap",
+        "lifecycle": "Rapid reproduction, 5-7 day lifecycle",
+        "control_methods": ["Miticide sprays", "Predatory mites", "Humidity control"]
+    },
+    "Thrips": {
+        "description": "Small, slender insects that feed on plant cells",
+        "lifecycle": "Complete lifecycle in 2-3 weeks",
+        "control_methods": ["Blue sticky traps", "Insecticidal soap", "Beneficial insects"]
+    }
+}
+
+DEFAULT_PEST_INFO = {
+    "description": "General pest information",
+    "lifecycle": "Variable lifecycle",
+    "control_methods": ["General pest control methods"]
+}
+
+# Shared generator for the simulated detections
+_RNG = np.random.default_rng()
+
+# Risk scores and priorities per severity level
+SEVERITY_TABLE = {
+    "High": {"crop_damage": 90, "yield_loss": 80, "economic": 85, "spread": 75, "priority": "Immediate", "treatment_priority": "High"},
+    "Medium": {"crop_damage": 60, "yield_loss": 50, "economic": 55, "spread": 45, "priority": "Short-term", "treatment_priority": "Medium"},
+    "Low": {"crop_damage": 30, "yield_loss": 20, "economic": 25, "spread": 15, "priority": "Short-term", "treatment_priority": "Medium"}
+}
+
+SEVERITY_COLORS = {"High": "#FF6B6B", "Medium": "#FFA500", "Low": "#32CD32"}
+
+# Cost-benefit estimates per severity level:
+# treatment cost (₹/ha), yield loss without treatment (%), ROI (%), break-even (months)
+COST_BENEFIT = {
+    "High": (10000, 55, 700, 1),
+    "Medium": (6500, 40, 500, 2),
+    "Low": (3500, 20, 300, 3)
+}
+
+@st.cache_data(show_spinner=False)
 def generate_pest_report(results, image_info):
-    """Generate comprehensive pest detection report"""
+    """Generate comprehensive pest detection report (cached per results / image info)"""
+    severity_level = results['severity_level']
+    severity = SEVERITY_TABLE[severity_level]
+    treatment_cost, yield_loss, roi, break_even = COST_BENEFIT[severity_level]
+    detections = results['detections']
+    num_detections = len(detections)
+    pest_types = sorted({det['label'] for det in detections})
+    mean_confidence = sum(det['confidence'] for det in detections) / num_detections if num_detections else 0.0
+    
     report = {
         "report_metadata": {
             "title": "Pest Detection Analysis Report",
@@ -85,26 +178,26 @@ def generate_pest_report(results, image_info):
             "image_info": image_info
         },
         "executive_summary": {
-            "total_pests_detected": len(results['detections']),
-            "pest_types": list(set([det['label'] for det in results['detections']])),
-            "severity_level": results['severity_level'],
-            "infestation_status": "High" if len(results['detections']) > 10 else "Medium" if len(results['detections']) > 5 else "Low",
+            "total_pests_detected": num_detections,
+            "pest_types": pest_types,
+            "severity_level": severity_level,
+            "infestation_status": "High" if num_detections > 10 else "Medium" if num_detections > 5 else "Low",
             "key_findings": [
-                f"Total pests detected: {len(results['detections'])}",
-                f"Pest types: {', '.join(set([det['label'] for det in results['detections']]))}",
-                f"Severity level: {results['severity_level']}",
+                f"Total pests detected: {num_detections}",
+                f"Pest types: {', '.join(pest_types)}",
+                f"Severity level: {severity_level}",
                 f"Recommended action: {results['recommended_action']}"
             ]
         },
         "risk_assessment": {
-            "overall_risk": "High" if results['severity_level'] == "High" else "Medium" if results['severity_level'] == "Medium" else "Low",
+            "overall_risk": severity_level,
             "risk_factors": {
-                "Crop Damage": 90 if results['severity_level'] == "High" else 60 if results['severity_level'] == "Medium" else 30,
-                "Yield Loss": 80 if results['severity_level'] == "High" else 50 if results['severity_level'] == "Medium" else 20,
-                "Economic Impact": 85 if results['severity_level'] == "High" else 55 if results['severity_level'] == "Medium" else 25,
-                "Spread Risk": 75 if results['severity_level'] == "High" else 45 if results['severity_level'] == "Medium" else 15
+                "Crop Damage": severity["crop_damage"],
+                "Yield Loss": severity["yield_loss"],
+                "Economic Impact": severity["economic"],
+                "Spread Risk": severity["spread"]
             },
-            "mitigation_priority": "Immediate" if results['severity_level'] == "High" else "Short-term"
+            "mitigation_priority": severity["priority"]
         },
         "timeline_recommendations": {
             "immediate_actions": [
@@ -124,10 +217,10 @@ def generate_pest_report(results, image_info):
             ]
         },
         "cost_benefit_analysis": {
-            "estimated_treatment_cost": f"₹{random.randint(3000, 12000)} per hectare",
-            "potential_yield_loss": f"{random.randint(20, 60)}% without treatment",
-            "roi_estimate": f"{random.randint(300, 800)}% return on investment",
-            "break_even_period": f"{random.randint(1, 3)} months"
+            "estimated_treatment_cost": f"₹{treatment_cost} per hectare",
+            "potential_yield_loss": f"{yield_loss}% without treatment",
+            "roi_estimate": f"{roi}% return on investment",
+            "break_even_period": f"{break_even} months"
         },
         "action_checklist": [
             "✓ Identify specific pest species",
@@ -152,34 +245,299 @@ def generate_pest_report(results, image_info):
         ],
         "technical_details": {
             "analysis_method": "Digital Image Processing + AI Object Detection",
-            "detection_confidence": f"{sum([det['confidence'] for det in results['detections']]) / len(results['detections']):.1f}%" if results['detections'] else "0%",
+            "detection_confidence": f"{mean_confidence:.1f}%" if num_detections else "0%",
             "image_quality": "High" if image_info.get('size', 0) > 100000 else "Medium",
-            "processing_time": f"{random.uniform(3.0, 6.0):.1f} seconds"
+            "processing_time": f"{results.get('elapsed_s', 0.0):.3f} seconds"
         }
     }
     
     return report
 
+@st.cache_data(show_spinner=False)
+def report_to_pdf(report_json):
+    """Render the serialized report to PDF bytes (cached, so reruns reuse the same bytes)"""
+    from modules.pdf_generator import PDFReportGenerator
+    report = json.loads(report_json)
+    pdf_buffer = PDFReportGenerator().create_report_sections_pdf(
+        "🐛 Krishi Sahayak - Pest Detection Report",
+        report.items()
+    )
+    return pdf_buffer.getvalue()
+
 def draw_bounding_boxes(image, detections):
     """Draw bounding boxes on image"""
-    img_array = np.array(image)
-    img_with_boxes = img_array.copy()
+    if not detections:
+        return image
     
-    for detection in detections:
-        x1, y1, x2, y2 = detection['bbox']
-        label = detection['label']
-        confidence = detection['confidence']
-        
+    import cv2
+    
+    # Read PIL's buffer through the array interface, then make the one writable copy OpenCV draws into
+    img_with_boxes = np.asarray(image).copy()
+    
+    bboxes = np.asarray([detection['bbox'] for detection in detections], dtype=np.int32)
+    
+    for (x1, y1, x2, y2), detection in zip(bboxes.tolist(), detections):
         # Draw bounding box
-        cv2.rectangle(img_with_boxes, (int(x1), int(y1)), (int(x2), int(y2)), (0, 255, 0), 2)
+        cv2.rectangle(img_with_boxes, (x1, y1), (x2, y2), (0, 255, 0), 2)
         
         # Draw label
-        label_text = f"{label}: {confidence:.1f}%"
-        cv2.putText(img_with_boxes, label_text, (int(x1), int(y1) - 10), 
+        label_text = f"{detection['label']}: {detection['confidence']:.1f}%"
+        cv2.putText(img_with_boxes, label_text, (x1, y1 - 10), 
                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
     
     return Image.fromarray(img_with_boxes)
 
+# Pest Management Specialist banner shown above both chat interfaces
+_CHATBOT_HEADER_HTML = """
+<div style="background: linear-gradient(135deg, #fff5f5 0%, #ffe8e8 100%); 
+            padding: 1.5rem; border-radius: 15px; margin: 1rem 0; 
+            border: 2px solid #FF6B6B; box-shadow: 0 8px 25px rgba(0,0,0,0.1);">
+    <h3 style="color: #d32f2f; margin-bottom: 1rem; text-align: center;">
+        🐛 Pest Management Specialist Chatbot
+    </h3>
+    <p style="text-align: center; color: #666; margin-bottom: 1rem;">
+        Powered by Groq AI - Specialized in pest identification, IPM strategies, and biological control
+    </p>
+</div>
+"""
+
+# Upload formats the browser can display directly from the original bytes
+BROWSER_IMAGE_TYPES = {"image/jpeg", "image/png"}
+
+# Longest side of the image embedded in the detection figure (boxes are scaled to match)
+DETECTION_VIEW_MAX_SIDE = 1280
+
+def encode_detection_view(image):
+    """Downscaled JPEG data URI of an upright image for the detection figure: (uri, (width, height), scale)"""
+    view = image.convert("RGB")
+    view.thumbnail((DETECTION_VIEW_MAX_SIDE, DETECTION_VIEW_MAX_SIDE), Image.BILINEAR)
+    buffer = io.BytesIO()
+    view.save(buffer, format="JPEG", quality=85)
+    image_uri = f"data:image/jpeg;base64,{base64.b64encode(buffer.getvalue()).decode()}"
+    return image_uri, view.size, view.width / image.width
+
+def create_detection_figure(image_uri, image_size, detections, scale=1.0):
+    """Show the image with pest boxes drawn client-side as Plotly shapes (bbox coordinates times scale)"""
+    import plotly.graph_objects as go
+    
+    width, height = image_size
+    fig = go.Figure(go.Image(source=image_uri))
+    
+    fig.update_layout(
+        shapes=[
+            dict(type="rect", x0=x1 * scale, y0=y1 * scale, x1=x2 * scale, y1=y2 * scale, line=dict(color="lime", width=2))
+            for x1, y1, x2, y2 in (detection['bbox'] for detection in detections)
+        ],
+        annotations=[
+            dict(
+                x=detection['bbox'][0] * scale, y=detection['bbox'][1] * scale,
+                text=f"{detection['label']}: {detection['confidence']:.1f}%",
+                showarrow=False, xanchor="left", yanchor="bottom",
+                font=dict(color="lime", size=14)
+            )
+            for detection in detections
+        ],
+        xaxis=dict(visible=False, range=[0, width]),
+        yaxis=dict(visible=False, range=[height, 0]),
+        margin=dict(l=0, r=0, t=0, b=0)
+    )
+    
+    return fig
+
+@st.fragment
+def _render_overview_tab():
+    """Overview tab: key metrics, detection boxes and pest count chart"""
+    results = st.session_state.pest_detection_results
+    detections = results['detections']
+    severity_level = results['severity_level']
+    pest_types_found = sorted({det['label'] for det in detections})
+    
+    st.markdown("### 📈 Detection Results")
+    
+    # Key metrics
+    col1, col2, col3 = st.columns(3)
+    
+    with col1:
+        st.markdown(f"""
+        <div class="metric-container">
+            <h2 style="color: #2E8B57;">{results['total_pests']}</h2>
+            <p>Pests Detected</p>
+        </div>
+        """, unsafe_allow_html=True)
+    
+    with col2:
+        st.markdown(f"""
+        <div class="metric-container">
+            <h2 style="color: #228B22;">{len(pest_types_found)}</h2>
+            <p>Pest Types</p>
+        </div>
+        """, unsafe_allow_html=True)
+    
+    with col3:
+        severity_color = SEVERITY_COLORS[severity_level]
+        st.markdown(f"""
+        <div class="metric-container">
+            <h2 style="color: {severity_color};">{severity_level}</h2>
+            <p>Severity Level</p>
+        </div>
+        """, unsafe_allow_html=True)
+    
+    # Display image with bounding boxes
+    if detections:
+        st.markdown("### 🎯 Detected Pests")
+        detection_view = st.session_state.pest_detection_view
+        if detection_view is not None:
+            image_uri, view_size, scale = detection_view
+            st.plotly_chart(create_detection_figure(image_uri, view_size, detections, scale), use_container_width=True)
+            st.caption("Pest Detection Results")
+        else:
+            st.image(st.session_state.pest_detection_boxed_image, caption="Pest Detection Results", use_column_width=True)
+        
+        # Pest count chart
+        # Only reached with detections, so the counts are never empty
+        st.plotly_chart(create_pest_count_chart(count_pests(detections)), use_container_width=True)
+    else:
+        st.success("✅ No pests detected in the image!")
+
+@st.fragment
+def _render_detailed_tab():
+    """Detailed Analysis tab: per-detection pest information and severity chart"""
+    results = st.session_state.pest_detection_results
+    detections = results['detections']
+    severity_level = results['severity_level']
+    
+    st.markdown("### 🔍 Detailed Analysis")
+    
+    if detections:
+        # Pest details
+        for i, detection in enumerate(detections, 1):
+            with st.expander(f"🐛 {detection['label']} (Confidence: {detection['confidence']:.1f}%)"):
+                st.markdown(f"**Location:** Bounding box coordinates")
+                st.markdown(f"**Confidence:** {detection['confidence']:.1f}%")
+                
+                info = PEST_INFO.get(detection['label'], DEFAULT_PEST_INFO)
+                
+                st.markdown(f"**Description:** {info['description']}")
+                st.markdown(f"**Lifecycle:** {info['lifecycle']}")
+                st.markdown(f"**Control Methods:** {', '.join(info['control_methods'])}")
+        
+        # Severity chart
+        severity_data = {
+            "Low": 1 if severity_level == "Low" else 0,
+            "Medium": 1 if severity_level == "Medium" else 0,
+            "High": 1 if severity_level == "High" else 0
+        }
+        st.plotly_chart(create_severity_chart(tuple(severity_data.items())), use_container_width=True)
+        
+        # Additional metrics
+        col1, col2 = st.columns(2)
+        with col1:
+            st.metric("Infestation Density", f"{results['total_pests']} pests/image")
+            st.metric("Treatment Priority", SEVERITY_TABLE[severity_level]["treatment_priority"])
+        with col2:
+            st.metric("Expected Damage", f"{results['expected_damage']}%")
+            st.metric("Control Success Rate", f"{results['control_success_rate']}%")
+    else:
+        st.success("✅ No pests detected! Your crop appears to be pest-free.")
+
+@st.fragment
+def _render_report_tab():
+    """Report tab: report sections and JSON/PDF downloads"""
+    results = st.session_state.pest_detection_results
+    
+    st.markdown("### 📄 Comprehensive Report")
+    
+    # Generate report
+    report = generate_pest_report(results, results['image_info'])
+    
+    # Display report sections
+    st.markdown("#### 📋 Executive Summary")
+    st.json(report['executive_summary'])
+    
+    st.markdown("#### ⚠️ Risk Assessment")
+    st.json(report['risk_assessment'])
+    
+    st.markdown("#### ⏰ Timeline Recommendations")
+    st.json(report['timeline_recommendations'])
+    
+    st.markdown("#### 💰 Cost-Benefit Analysis")
+    st.json(report['cost_benefit_analysis'])
+    
+    st.markdown("#### ✅ Action Checklist")
+    for item in report['action_checklist']:
+        st.markdown(item)
+    
+    st.markdown("#### 🔄 Follow-up Actions")
+    for action in report['follow_up_actions']:
+        st.markdown(f"• {action}")
+    
+    st.markdown("#### 🛡️ Prevention Strategies")
+    for strategy in report['prevention_strategies']:
+        st.markdown(f"• {strategy}")
+    
+    # Download report
+    report_json = json.dumps(report, indent=2, default=str)
+    st.download_button(
+        label="📄 Download Detailed Report",
+        data=report_json,
+        file_name=f"pest_detection_report_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
+        mime="application/json"
+    )
+    
+    # PDF download (rendered once per report)
+    try:
+        st.download_button(
+            label="📄 Download PDF Report",
+            data=report_to_pdf(report_json),
+            file_name=f"pest_detection_report_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf",
+            mime="application/pdf"
+        )
+    except Exception as e:
+        st.error(f"❌ PDF generation error: {e}")
+
+@st.fragment
+def _render_chat_tab():
+    """Chat Assistant tab: chatbot seeded with the analysis context"""
+    results = st.session_state.pest_detection_results
+    detections = results['detections']
+    pest_types_found = sorted({det['label'] for det in detections})
+    
+    st.markdown("### 💬 Chat with Pest Management Expert")
+    analysis_context = f"Pests Detected: {len(detections)}, Types: {', '.join(pest_types_found) if pest_types_found else 'None'}, Severity: {results['severity_level']}"
+    
+    # Enhanced Pest Detection Chatbot with Groq API
+    st.markdown(_CHATBOT_HEADER_HTML, unsafe_allow_html=True)
+    
+    # Use the enhanced chat interface with unique key
+    if CHATBOT_AVAILABLE:
+        try:
+            create_chat_interface("pest_detection", analysis_context, use_api=True, unique_key="pest_detection_analysis_chat", client=_get_chatbot_client())
+        except Exception as e:
+            st.error(f"❌ Chatbot error: {str(e)}")
+            st.info("💡 Please try refreshing the page or contact support.")
+    else:
+        st.error(f"❌ Chatbot module import failed: {CHATBOT_IMPORT_ERROR}")
+
+def render_results_tabs():
+    """Render the analysis tabs from results persisted in st.session_state
+
+    Each tab is its own fragment, so a widget inside one tab (chat input, download
+    button) reruns only that tab instead of the whole page and every chart.
+    """
+    tab1, tab2, tab3, tab4 = st.tabs(["📊 Overview", "🔍 Detailed Analysis", "📄 Report", "💬 Chat Assistant"])
+    
+    with tab1:
+        _render_overview_tab()
+    
+    with tab2:
+        _render_detailed_tab()
+    
+    with tab3:
+        _render_report_tab()
+    
+    with tab4:
+        _render_chat_tab()
+
 def main():
     st.markdown("""
     <div style="text-align: center; padding: 2rem 0;">
@@ -195,26 +553,17 @@ def main():
     
     # Expert Pest Detection Chatbot on Home Page
     st.markdown("### 💬 Pest Management Expert Assistant")
-    st.markdown("""
-    <div style="background: linear-gradient(135deg, #fff5f5 0%, #ffe8e8 100%); 
-                padding: 1.5rem; border-radius: 15px; margin: 1rem 0; 
-                border: 2px solid #FF6B6B; box-shadow: 0 8px 25px rgba(0,0,0,0.1);">
-        <h3 style="color: #d32f2f; margin-bottom: 1rem; text-align: center;">
-            🐛 Pest Management Specialist Chatbot
-        </h3>
-        <p style="text-align: center; color: #666; margin-bottom: 1rem;">
-            Powered by Groq AI - Specialized in pest identification, IPM strategies, and biological control
-        </p>
-    </div>
-    """, unsafe_allow_html=True)
+    st.markdown(_CHATBOT_HEADER_HTML, unsafe_allow_html=True)
     
     # Display chatbot interface on starting page with unique key
-    try:
-        from modules.enhanced_chatbot import create_chat_interface
-        create_chat_interface("pest_detection", None, use_api=True, unique_key="pest_detection_main_chat")
-    except Exception as e:
-        st.error(f"❌ Chatbot initialization error: {str(e)}")
-        st.info("💡 Please refresh the page or contact support if the issue persists.")
+    if CHATBOT_AVAILABLE:
+        try:
+            create_chat_interface("pest_detection", None, use_api=True, unique_key="pest_detection_main_chat", client=_get_chatbot_client())
+        except Exception as e:
+            st.error(f"❌ Chatbot initialization error: {str(e)}")
+            st.info("💡 Please refresh the page or contact support if the issue persists.")
+    else:
+        st.error(f"❌ Chatbot module import failed: {CHATBOT_IMPORT_ERROR}")
     
     st.markdown("---")
     
@@ -226,9 +575,13 @@ def main():
     )
     
     if uploaded_file is not None:
-        # Display image information
+        # Display image information (Image.open only parses the header; pixels decode on first use)
         image = Image.open(uploaded_file)
-        st.image(image, caption="Uploaded Crop Image", use_column_width=True)
+        if uploaded_file.type in BROWSER_IMAGE_TYPES:
+            # Ship the uploaded bytes as-is instead of re-encoding a decoded PIL image
+            st.image(uploaded_file.getvalue(), caption="Uploaded Crop Image", use_column_width=True)
+        else:
+            st.image(image, caption="Uploaded Crop Image", use_column_width=True)
         
         # Image information
         col1, col2, col3 = st.columns(3)
@@ -242,27 +595,31 @@ def main():
         # Analysis button
         if st.button("🔍 Detect Pests", type="primary", use_container_width=True):
             with st.spinner("🤖 Detecting pests using AI..."):
-                # Simulate pest detection
-                pest_types = ["Aphids", "Whiteflies", "Caterpillars", "Beetles", "Mites", "Thrips"]
-                num_pests = random.randint(0, 15)
+                start_time = time.perf_counter()
+                
+                # Work on the upright image, as the browser shows phone photos with EXIF orientation applied
+                image = ImageOps.exif_transpose(image)
+                
+                # Simulate pest detection (all random draws batched per field)
+                num_pests = int(_RNG.integers(0, 15, endpoint=True))
+                img_width, img_height = image.size
+                type_idx = _RNG.integers(0, len(PEST_TYPES), num_pests)
+                confidences = _RNG.uniform(70, 95, num_pests)
+                
+                # Generate random bounding boxes
+                x1 = _RNG.integers(0, max(img_width - 100, 0), num_pests, endpoint=True)
+                y1 = _RNG.integers(0, max(img_height - 100, 0), num_pests, endpoint=True)
+                x2 = x1 + _RNG.integers(50, 150, num_pests, endpoint=True)
+                y2 = y1 + _RNG.integers(50, 150, num_pests, endpoint=True)
                 
-                detections = []
-                for i in range(num_pests):
-                    pest_type = random.choice(pest_types)
-                    confidence = random.uniform(70, 95)
-                    
-                    # Generate random bounding box
-                    img_width, img_height = image.size
-                    x1 = random.randint(0, img_width - 100)
-                    y1 = random.randint(0, img_height - 100)
-                    x2 = x1 + random.randint(50, 150)
-                    y2 = y1 + random.randint(50, 150)
-                    
-                    detections.append({
-                        'label': pest_type,
-                        'confidence': confidence,
-                        'bbox': [x1, y1, x2, y2]
-                    })
+                # .tolist() converts each array to Python scalars in one C-level pass
+                detections = [
+                    {'label': PEST_TYPES[t], 'confidence': c, 'bbox': [a, b, cc, dd]}
+                    for t, c, a, b, cc, dd in zip(
+                        type_idx.tolist(), confidences.tolist(),
+                        x1.tolist(), y1.tolist(), x2.tolist(), y2.tolist()
+                    )
+                ]
                 
                 # Determine severity level
                 if num_pests > 10:
@@ -284,213 +641,36 @@ def main():
                     'detections': detections,
                     'severity_level': severity_level,
                     'recommended_action': recommendations[severity_level],
-                    'total_pests': num_pests
+                    'total_pests': num_pests,
+                    'elapsed_s': time.perf_counter() - start_time
                 }
                 
-                st.session_state.pest_detection_results = results
-                st.session_state.pest_detection_analyzed = True
-                
-                # Display results in tabs
-                tab1, tab2, tab3, tab4 = st.tabs(["📊 Overview", "🔍 Detailed Analysis", "📄 Report", "💬 Chat Assistant"])
-                
-                with tab1:
-                    st.markdown("### 📈 Detection Results")
-                    
-                    # Key metrics
-                    col1, col2, col3 = st.columns(3)
-                    
-                    with col1:
-                        st.markdown(f"""
-                        <div class="metric-container">
-                            <h2 style="color: #2E8B57;">{num_pests}</h2>
-                            <p>Pests Detected</p>
-                        </div>
-                        """, unsafe_allow_html=True)
-                    
-                    with col2:
-                        pest_types_found = list(set([det['label'] for det in detections]))
-                        st.markdown(f"""
-                        <div class="metric-container">
-                            <h2 style="color: #228B22;">{len(pest_types_found)}</h2>
-                            <p>Pest Types</p>
-                        </div>
-                        """, unsafe_allow_html=True)
-                    
-                    with col3:
-                        severity_color = "#FF6B6B" if severity_level == "High" else "#FFA500" if severity_level == "Medium" else "#32CD32"
-                        st.markdown(f"""
-                        <div class="metric-container">
-                            <h2 style="color: {severity_color};">{severity_level}</h2>
-                            <p>Severity Level</p>
-                        </div>
-                        """, unsafe_allow_html=True)
-                    
-                    # Display image with bounding boxes
-                    if detections:
-                        st.markdown("### 🎯 Detected Pests")
-                        img_with_boxes = draw_bounding_boxes(image, detections)
-                        st.image(img_with_boxes, caption="Pest Detection Results", use_column_width=True)
-                        
-                        # Pest count chart
-                        pest_chart = create_pest_count_chart(detections)
-                        if pest_chart:
-                            st.plotly_chart(pest_chart, use_container_width=True)
-                    else:
-                        st.success("✅ No pests detected in the image!")
-                
-                with tab2:
-                    st.markdown("### 🔍 Detailed Analysis")
+                # Keep what the tabs need for reruns (chat input, downloads)
+                results['image_id'] = uploaded_file.file_id
+                results['image_info'] = {
+                    'filename': uploaded_file.name,
+                    'size': uploaded_file.size,
+                    'dimensions': f"{image.size[0]}x{image.size[1]}"
+                }
+                results['expected_damage'] = random.randint(10, 50)
+                results['control_success_rate'] = random.randint(80, 95)
                 
-                if detections:
-                        # Pest details
-                        for i, detection in enumerate(detections, 1):
-                            with st.expander(f"🐛 {detection['label']} (Confidence: {detection['confidence']:.1f}%)"):
-                                st.markdown(f"**Location:** Bounding box coordinates")
-                                st.markdown(f"**Confidence:** {detection['confidence']:.1f}%")
-                                
-                                # Pest-specific information
-                                pest_info = {
-                                    "Aphids": {
-                                        "description": "Small, soft-bodied insects that suck plant sap",
-                                        "lifecycle": "Reproduce rapidly, 7-10 day generation time",
-                                        "control_methods": ["Neem oil spray", "Insecticidal soap", "Beneficial insects"]
-                                    },
-                                    "Whiteflies": {
-                                        "description": "Small white insects that feed on plant sap",
-                                        "lifecycle": "Complete lifecycle in 3-4 weeks",
-                                        "control_methods": ["Yellow sticky traps", "Horticultural oil", "Biological control"]
-                                    },
-                                    "Caterpillars": {
-                                        "description": "Larval stage of moths and butterflies",
-                                        "lifecycle": "Feed voraciously for 2-4 weeks before pupation",
-                                        "control_methods": ["Bt (Bacillus thuringiensis)", "Hand picking", "Natural predators"]
-                                    },
-                                    "Beetles": {
-                                        "description": "Hard-shelled insects that chew on plant tissue",
-                                        "lifecycle": "Complete metamorphosis, 4-6 week lifecycle",
-                                        "control_methods": ["Pyrethrin sprays", "Crop rotation", "Trap crops"]
-                                    },
-                                    "Mites": {
-                                        "description": "Tiny arachnids that suck plant sap",
-                                        "lifecycle": "Rapid reproduction, 5-7 day lifecycle",
-                                        "control_methods": ["Miticide sprays", "Predatory mites", "Humidity control"]
-                                    },
-                                    "Thrips": {
-                                        "description": "Small, slender insects that feed on plant cells",
-                                        "lifecycle": "Complete lifecycle in 2-3 weeks",
-                                        "control_methods": ["Blue sticky traps", "Insecticidal soap", "Beneficial insects"]
-                                    }
-                                }
-                                
-                                info = pest_info.get(detection['label'], {
-                                    "description": "General pest information",
-                                    "lifecycle": "Variable lifecycle",
-                                    "control_methods": ["General pest control methods"]
-                                })
-                                
-                                st.markdown(f"**Description:** {info['description']}")
-                                st.markdown(f"**Lifecycle:** {info['lifecycle']}")
-                                st.markdown(f"**Control Methods:** {', '.join(info['control_methods'])}")
-                        
-                        # Severity chart
-                        severity_data = {
-                            "Low": 1 if severity_level == "Low" else 0,
-                            "Medium": 1 if severity_level == "Medium" else 0,
-                            "High": 1 if severity_level == "High" else 0
-                        }
-                        st.plotly_chart(create_severity_chart(severity_data), use_container_width=True)
-                        
-                        # Additional metrics
-                        col1, col2 = st.columns(2)
-                        with col1:
-                            st.metric("Infestation Density", f"{num_pests} pests/image")
-                            st.metric("Treatment Priority", "High" if severity_level == "High" else "Medium")
-                        with col2:
-                            st.metric("Expected Damage", f"{random.randint(10, 50)}%")
-                            st.metric("Control Success Rate", f"{random.randint(80, 95)}%")
+                # Detection view built once per analysis
+                if uploaded_file.type in BROWSER_IMAGE_TYPES:
+                    # Boxes are overlaid in the browser on a bounded re-encode, not the full upload
+                    st.session_state.pest_detection_view = encode_detection_view(image)
+                    st.session_state.pest_detection_boxed_image = None
                 else:
-                    st.success("✅ No pests detected! Your crop appears to be pest-free.")
+                    st.session_state.pest_detection_view = None
+                    st.session_state.pest_detection_boxed_image = draw_bounding_boxes(image, detections)
                 
-                with tab3:
-                    st.markdown("### 📄 Comprehensive Report")
-                    
-                    # Generate report
-                    image_info = {
-                        'filename': uploaded_file.name,
-                        'size': uploaded_file.size,
-                        'dimensions': f"{image.size[0]}x{image.size[1]}"
-                    }
-                    
-                    report = generate_pest_report(results, image_info)
-                    
-                    # Display report sections
-                    st.markdown("#### 📋 Executive Summary")
-                    st.json(report['executive_summary'])
-                    
-                    st.markdown("#### ⚠️ Risk Assessment")
-                    st.json(report['risk_assessment'])
-                    
-                    st.markdown("#### ⏰ Timeline Recommendations")
-                    st.json(report['timeline_recommendations'])
-                    
-                    st.markdown("#### 💰 Cost-Benefit Analysis")
-                    st.json(report['cost_benefit_analysis'])
-                    
-                    st.markdown("#### ✅ Action Checklist")
-                    for item in report['action_checklist']:
-                        st.markdown(item)
-                    
-                    st.markdown("#### 🔄 Follow-up Actions")
-                    for action in report['follow_up_actions']:
-                        st.markdown(f"• {action}")
-                    
-                    st.markdown("#### 🛡️ Prevention Strategies")
-                    for strategy in report['prevention_strategies']:
-                        st.markdown(f"• {strategy}")
-                    
-                    # Download report
-                    report_json = json.dumps(report, indent=2, default=str)
-                    st.download_button(
-                        label="📄 Download Detailed Report",
-                        data=report_json,
-                        file_name=f"pest_detection_report_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
-                        mime="application/json"
-                    )
-                    
-                    # PDF download placeholder
-                    pdf_buffer = io.BytesIO()
-                    st.download_button(
-                        label="📄 Download PDF Report",
-                        data=pdf_buffer,
-                        file_name=f"pest_detection_report_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf",
-                        mime="application/pdf"
-                    )
-                
-                with tab4:
-                    st.markdown("### 💬 Chat with Pest Management Expert")
-                    analysis_context = f"Pests Detected: {len(detections)}, Types: {', '.join([det['label'] for det in detections]) if detections else 'None'}, Severity: {results['severity_level']}"
-                    
-                    # Enhanced Pest Detection Chatbot with Groq API
-                    st.markdown("""
-                    <div style="background: linear-gradient(135deg, #fff5f5 0%, #ffe8e8 100%); 
-                                padding: 1.5rem; border-radius: 15px; margin: 1rem 0; 
-                                border: 2px solid #FF6B6B; box-shadow: 0 8px 25px rgba(0,0,0,0.1);">
-                        <h3 style="color: #d32f2f; margin-bottom: 1rem; text-align: center;">
-                            🐛 Pest Management Specialist Chatbot
-                        </h3>
-                        <p style="text-align: center; color: #666; margin-bottom: 1rem;">
-                            Powered by Groq AI - Specialized in pest identification, IPM strategies, and biological control
-                        </p>
-                    </div>
-                    """, unsafe_allow_html=True)
-                    
-                    # Use the enhanced chat interface with unique key
-                    try:
-                        from modules.enhanced_chatbot import create_chat_interface
-                        create_chat_interface("pest_detection", analysis_context, use_api=True, unique_key="pest_detection_analysis_chat")
-                    except Exception as e:
-                        st.error(f"❌ Chatbot error: {str(e)}")
-                        st.info("💡 Please try refreshing the page or contact support.")
+                st.session_state.pest_detection_results = results
+                st.session_state.pest_detection_analyzed = True
+        
+        # Render the last analysis of this upload on every rerun (e.g. after a chat message)
+        results = st.session_state.get('pest_detection_results')
+        if results is not None and results.get('image_id') == uploaded_file.file_id:
+            render_results_tabs()
     
     else:
         st.info("👆 Please upload a crop image to start pest detection.")
@@ -1,21 +1,23 @@
 import streamlit as st
-import cv2
 import numpy as np
-import pandas as pd
-import plotly.graph_objects as go
-import plotly.express as px
 from PIL import Image, ImageDraw
 import json
 import datetime
 import io
 import base64
 from pathlib import Path
-import random
+import zlib
 
 # Import modules
-from modules import preprocessing, model_inference, chatbot
 from config import CUSTOM_CSS, MODEL_CONFIGS
 
+# Optional orjson for the report download (falls back to the stdlib json module)
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
 # Inject custom CSS
 st.markdown(CUSTOM_CSS, unsafe_allow_html=True)
 
@@ -26,8 +28,10 @@ st.set_page_config(
     layout="wide"
 )
 
+@st.cache_data(show_spinner=False)
 def create_weed_coverage_chart(weed_percentage, crop_percentage):
-    """Create weed coverage pie chart"""
+    """Create weed coverage pie chart (cached; callers pass percentages rounded to 0.1)"""
+    import plotly.graph_objects as go
     fig = go.Figure(data=[
         go.Pie(
             labels=['Weeds', 'Crops'],
@@ -45,12 +49,49 @@ def create_weed_coverage_chart(weed_percentage, crop_percentage):
     
     return fig
 
-def create_weed_density_map(weed_mask):
-    """Create weed density heatmap"""
-    fig = go.Figure(data=go.Heatmap(
-        z=weed_mask,
-        colorscale='RdYlGn_r',
-        showscale=True
+# Longest side (in cells) of the grid sent to the density heatmap
+DENSITY_MAP_MAX_SIDE = 200
+
+# Plotly's 'RdYlGn_r' (ColorBrewer RdYlGn reversed): low density green, high density red
+_RDYLGN_R_STOPS = np.array([
+    (0, 104, 55), (26, 152, 80), (102, 189, 99), (166, 217, 106), (217, 239, 139), (255, 255, 191),
+    (254, 224, 139), (253, 174, 97), (244, 109, 67), (215, 48, 39), (165, 0, 38)
+], dtype=np.float64)
+
+# Density is quantised to 16 levels (4 bits); level k takes the colorscale value at k * 17
+_DENSITY_LEVEL_SHIFT = 4
+_DENSITY_PALETTE = np.stack([
+    np.interp(np.arange(16) * 17, np.linspace(0, 255, len(_RDYLGN_R_STOPS)), _RDYLGN_R_STOPS[:, channel])
+    for channel in range(3)
+], axis=1).round().astype(np.uint8)
+
+@st.cache_data(show_spinner=False)
+def create_weed_density_map(weed_mask, downsample=True):
+    """Create weed density heatmap (cached per mask)"""
+    import cv2
+    import plotly.graph_objects as go
+    height, width = weed_mask.shape[:2]
+    dx = dy = 1
+    
+    # Area-average large masks onto a small grid; axes keep pixel units via dx/dy
+    scale = DENSITY_MAP_MAX_SIDE / max(height, width)
+    if downsample and scale < 1:
+        grid_w, grid_h = max(1, round(width * scale)), max(1, round(height * scale))
+        weed_mask = cv2.resize(weed_mask, (grid_w, grid_h), interpolation=cv2.INTER_AREA)
+        dx, dy = width / grid_w, height / grid_h
+    
+    # Ship one 4-bit palette PNG instead of a per-cell z array
+    levels = weed_mask >> _DENSITY_LEVEL_SHIFT
+    bitmap = Image.frombytes("P", (levels.shape[1], levels.shape[0]), levels.tobytes())
+    bitmap.putpalette(_DENSITY_PALETTE.tobytes())
+    buffer = io.BytesIO()
+    bitmap.save(buffer, format="PNG", bits=4)
+    image_uri = f"data:image/png;base64,{base64.b64encode(buffer.getvalue()).decode()}"
+    
+    fig = go.Figure(data=go.Image(
+        source=image_uri,
+        dx=dx,
+        dy=dy
     ))
     
     fig.update_layout(
@@ -62,8 +103,29 @@ def create_weed_density_map(weed_mask):
     
     return fig
 
+# Inclusive bounds of the simulated integer figures: report treatment cost (₹/ha), yield loss (%),
+# ROI (%), break-even (months); detailed-tab treatment cost (₹/ha), recovery (days), control success (%)
+_FIGURE_LOWS = np.array([2500, 25, 250, 2, 2000, 14, 85])
+_FIGURE_HIGHS = np.array([10000, 70, 600, 4, 8000, 30, 95])
+
+# Bounds of the simulated segmentation accuracy (%) and processing time (s)
+_UNIFORM_LOWS = np.array([85, 4.0])
+_UNIFORM_HIGHS = np.array([95, 8.0])
+
+@st.cache_data(show_spinner=False)
+def _simulated_figures(weed_percentage, severity_level):
+    """All simulated report / metric figures in two draws, fixed per analysis so reruns don't flicker"""
+    rng = np.random.default_rng(zlib.crc32(f"{weed_percentage:.6f}|{severity_level}".encode("utf-8")))
+    integers = rng.integers(_FIGURE_LOWS, _FIGURE_HIGHS, endpoint=True).tolist()
+    uniforms = rng.uniform(_UNIFORM_LOWS, _UNIFORM_HIGHS).tolist()
+    return tuple(integers), tuple(uniforms)
+
+@st.cache_data(show_spinner=False)
 def generate_weed_report(results, image_info):
-    """Generate comprehensive weed detection report"""
+    """Generate comprehensive weed detection report (cached per results / image info)"""
+    integers, (accuracy, processing_time) = _simulated_figures(results['weed_percentage'], results['severity_level'])
+    treatment_cost, yield_loss, roi, break_even = integers[:4]
+    
     report = {
         "report_metadata": {
             "title": "Weed Detection Analysis Report",
@@ -111,10 +173,10 @@ def generate_weed_report(results, image_info):
             ]
         },
         "cost_benefit_analysis": {
-            "estimated_treatment_cost": f"₹{random.randint(2500, 10000)} per hectare",
-            "potential_yield_loss": f"{random.randint(25, 70)}% without treatment",
-            "roi_estimate": f"{random.randint(250, 600)}% return on investment",
-            "break_even_period": f"{random.randint(2, 4)} months"
+            "estimated_treatment_cost": f"₹{treatment_cost} per hectare",
+            "potential_yield_loss": f"{yield_loss}% without treatment",
+            "roi_estimate": f"{roi}% return on investment",
+            "break_even_period": f"{break_even} months"
         },
         "action_checklist": [
             "✓ Identify weed species and density",
@@ -139,43 +201,366 @@ def generate_weed_report(results, image_info):
         ],
         "technical_details": {
             "analysis_method": "Digital Image Processing + AI Segmentation",
-            "segmentation_accuracy": f"{random.uniform(85, 95):.1f}%",
+            "segmentation_accuracy": f"{accuracy:.1f}%",
             "image_quality": "High" if image_info.get('size', 0) > 100000 else "Medium",
-            "processing_time": f"{random.uniform(4.0, 8.0):.1f} seconds"
+            "analysis_downscale_ratio": f"{image_info.get('analysis_scale', 1.0):.2f}",
+            "processing_time": f"{processing_time:.1f} seconds"
         }
     }
     
     return report
 
+# Longest side (px) of the copy used for mask generation and the overlay
+_ANALYSIS_MAX_SIDE = 1280
+
+def downsample_for_analysis(image):
+    """Shrink an RGB array so the longest side is at most _ANALYSIS_MAX_SIDE"""
+    height, width = image.shape[:2]
+    scale = _ANALYSIS_MAX_SIDE / max(width, height)
+    if scale < 1:
+        import cv2
+        return cv2.resize(image, (int(width * scale), int(height * scale)), interpolation=cv2.INTER_AREA)
+    return image
+
+# Cap on the boolean (patches, height, width) tensor built per chunk in create_weed_mask
+_MASK_CHUNK_PIXELS = 1 << 24
+
+_RNG = np.random.default_rng()
+
+@st.cache_data(show_spinner=False)
+def _dump_report(report):
+    """Serialize a report dict to indented JSON bytes (orjson when available, cached per report)"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(report, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS, default=str)
+    return json.dumps(report, indent=2, default=str).encode("utf-8")
+
+@st.cache_data(show_spinner=False)
+def report_to_pdf(report_json):
+    """Render the serialized report to PDF bytes (cached, so reruns reuse the same bytes)"""
+    from modules.pdf_generator import PDFReportGenerator
+    report = json.loads(report_json)
+    pdf_buffer = PDFReportGenerator().create_report_sections_pdf(
+        "🌱 Krishi Sahayak - Weed Detection Report",
+        report.items()
+    )
+    return pdf_buffer.getvalue()
+
 def create_weed_mask(image_size, weed_percentage):
     """Create simulated weed segmentation mask"""
     height, width = image_size[1], image_size[0]
-    mask = np.zeros((height, width), dtype=np.uint8)
     
-    # Create random weed patches
+    # Draw all random weed patches at once
     num_patches = int(weed_percentage / 10) + 1
-    for _ in range(num_patches):
-        center_x = random.randint(0, width)
-        center_y = random.randint(0, height)
-        radius = random.randint(20, 80)
-        
-        cv2.circle(mask, (center_x, center_y), radius, 255, -1)
+    cx = _RNG.integers(0, width, num_patches, endpoint=True)[:, None, None]
+    cy = _RNG.integers(0, height, num_patches, endpoint=True)[:, None, None]
+    r = _RNG.integers(20, 80, num_patches, endpoint=True)[:, None, None]
+    
+    # Union of disks, in patch chunks to bound peak memory on large images
+    yy, xx = np.ogrid[:height, :width]
+    covered = None
+    step = max(1, _MASK_CHUNK_PIXELS // max(1, height * width))
+    for start in range(0, num_patches, step):
+        stop = start + step
+        disks = (xx - cx[start:stop]) ** 2 + (yy - cy[start:stop]) ** 2 <= r[start:stop] ** 2
+        if covered is None:
+            covered = disks.any(axis=0)
+        else:
+            covered |= disks.any(axis=0)
     
+    # Reuse the boolean buffer as the 0/255 uint8 mask (no zero-init, no extra copy)
+    mask = covered.view(np.uint8)
+    mask *= 255
     return mask
 
-def overlay_weed_mask(image, weed_mask):
-    """Overlay weed mask on original image"""
-    img_array = np.array(image)
-    weed_overlay = img_array.copy()
-    
-    # Create colored overlay
-    weed_overlay[weed_mask > 0] = [255, 0, 0]  # Red for weeds
+def overlay_weed_mask(img_array, weed_mask):
+    """Overlay weed mask on the original RGB array"""
+    import cv2
+    result = img_array.copy()
     
-    # Blend with original image
+    # Blend red into the weed pixels only: (1-alpha)*pixel + alpha*red
     alpha = 0.3
-    result = cv2.addWeighted(img_array, 1-alpha, weed_overlay, alpha, 0)
+    scaled = cv2.convertScaleAbs(img_array, alpha=1 - alpha)
+    cv2.add(scaled, (255 * alpha, 0, 0, 0), dst=result, mask=weed_mask)
+    
+    return result
+
+# Impact (%) per factor for each severity level (Detailed Analysis tab)
+IMPACT_TABLE = {
+    "High": {"Yield Impact": 90, "Nutrient Competition": 85, "Water Competition": 80, "Harvest Difficulty": 75},
+    "Medium": {"Yield Impact": 60, "Nutrient Competition": 55, "Water Competition": 50, "Harvest Difficulty": 45},
+    "Low": {"Yield Impact": 30, "Nutrient Competition": 25, "Water Competition": 20, "Harvest Difficulty": 15}
+}
+
+# Recommended action per severity level
+RECOMMENDATIONS = {
+    "High": "Immediate herbicide application required",
+    "Medium": "Targeted herbicide application recommended",
+    "Low": "Manual weeding or spot treatment sufficient"
+}
+
+@st.cache_data(show_spinner=False)
+def _run_weed_analysis(file_bytes, image_size):
+    """Simulate weed segmentation once per uploaded file (keyed on its bytes)"""
+    weed_percentage = float(_RNG.uniform(5, 45))
+    crop_percentage = 100 - weed_percentage
+    
+    # Determine severity level
+    if weed_percentage > 30:
+        severity_level = "High"
+    elif weed_percentage > 15:
+        severity_level = "Medium"
+    else:
+        severity_level = "Low"
+    
+    return {
+        'weed_percentage': weed_percentage,
+        'crop_percentage': crop_percentage,
+        'severity_level': severity_level,
+        'recommended_action': RECOMMENDATIONS[severity_level],
+        'weed_mask': create_weed_mask(image_size, weed_percentage)
+    }
+
+@st.fragment
+def _render_overview_tab():
+    """Overview tab: key metrics, segmentation overlay and coverage chart"""
+    results = st.session_state.weed_detection_results
+    weed_percentage = results['weed_percentage']
+    crop_percentage = results['crop_percentage']
+    severity_level = results['severity_level']
+    weed_mask = results['weed_mask']
+    image = st.session_state.weed_detection_image
+    image_small = st.session_state.weed_detection_image_small
+    
+    st.markdown("### 📈 Analysis Results")
+    
+    # Key metrics
+    col1, col2, col3, col4 = st.columns(4)
+    
+    with col1:
+        st.markdown(f"""
+        <div class="metric-container">
+            <h2 style="color: #FF6B6B;">{weed_percentage:.1f}%</h2>
+            <p>Weed Coverage</p>
+        </div>
+        """, unsafe_allow_html=True)
+    
+    with col2:
+        st.markdown(f"""
+        <div class="metric-container">
+            <h2 style="color: #32CD32;">{crop_percentage:.1f}%</h2>
+            <p>Crop Coverage</p>
+        </div>
+        """, unsafe_allow_html=True)
+    
+    with col3:
+        severity_color = "#FF6B6B" if severity_level == "High" else "#FFA500" if severity_level == "Medium" else "#32CD32"
+        st.markdown(f"""
+        <div class="metric-container">
+            <h2 style="color: {severity_color};">{severity_level}</h2>
+            <p>Severity Level</p>
+        </div>
+        """, unsafe_allow_html=True)
+    
+    with col4:
+        st.markdown(f"""
+        <div class="metric-container">
+            <h2 style="color: #228B22;">{results['recommended_action'].split()[0]}</h2>
+            <p>Recommended Action</p>
+        </div>
+        """, unsafe_allow_html=True)
+    
+    # Weed segmentation visualization
+    st.markdown("### 🎯 Weed Segmentation")
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        st.markdown("**Original Image**")
+        st.image(image, use_column_width=True)
+    
+    with col2:
+        st.markdown("**Weed Detection Mask**")
+        weed_overlay = overlay_weed_mask(image_small, weed_mask)
+        st.image(weed_overlay, use_column_width=True)
+    
+    # Coverage chart
+    coverage_chart = create_weed_coverage_chart(round(weed_percentage, 1), round(crop_percentage, 1))
+    st.plotly_chart(coverage_chart, use_container_width=True)
+
+@st.fragment
+def _render_detailed_tab():
+    """Detailed Analysis tab: impact, treatments, density map and outcome metrics"""
+    results = st.session_state.weed_detection_results
+    weed_percentage = results['weed_percentage']
+    crop_percentage = results['crop_percentage']
+    severity_level = results['severity_level']
+    weed_mask = results['weed_mask']
+    
+    st.markdown("### 🔍 Detailed Analysis")
+    
+    # Weed analysis details
+    st.markdown(f"""
+    <div class="info-box">
+        <h3>🌱 Weed Analysis Results</h3>
+        <p><strong>Weed Coverage:</strong> {weed_percentage:.1f}% of the field area</p>
+        <p><strong>Crop Coverage:</strong> {crop_percentage:.1f}% of the field area</p>
+        <p><strong>Weed-to-Crop Ratio:</strong> {weed_percentage/crop_percentage:.2f}:1</p>
+        <p><strong>Severity Level:</strong> {severity_level}</p>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    # Impact assessment
+    st.markdown("### 📊 Impact Assessment")
+    
+    # Plain {column: {factor: value}} dict; st.bar_chart builds the frame itself
+    st.bar_chart({'Impact %': IMPACT_TABLE[severity_level]})
+    
+    # Treatment recommendations
+    st.markdown("### 🛠️ Treatment Recommendations")
+    
+    treatment_options = {
+        "High": [
+            "Broadcast herbicide application",
+            "Pre-emergence herbicide",
+            "Post-emergence herbicide",
+            "Mechanical cultivation"
+        ],
+        "Medium": [
+            "Targeted herbicide application",
+            "Spot treatment",
+            "Manual weeding",
+            "Mulching"
+        ],
+        "Low": [
+            "Manual weeding",
+            "Spot herbicide treatment",
+            "Mulching",
+            "Crop competition enhancement"
+        ]
+    }
+    
+    # One markdown element per list; "  \n" keeps each item on its own line
+    st.markdown("  \n".join(f"**{i}.** {option}" for i, option in enumerate(treatment_options[severity_level], 1)))
     
-    return Image.fromarray(result)
+    # Weed density heatmap
+    st.markdown("### 🗺️ Weed Density Map")
+    density_chart = create_weed_density_map(weed_mask)
+    st.plotly_chart(density_chart, use_container_width=True)
+    
+    # Additional metrics
+    treatment_cost, recovery_days, control_success = _simulated_figures(weed_percentage, severity_level)[0][4:]
+    col1, col2 = st.columns(2)
+    with col1:
+        st.metric("Treatment Priority", "High" if severity_level == "High" else "Medium")
+        st.metric("Expected Control Success", f"{control_success}%")
+    with col2:
+        st.metric("Treatment Cost", f"₹{treatment_cost}/hectare")
+        st.metric("Recovery Time", f"{recovery_days} days")
+
+@st.fragment
+def _render_report_tab():
+    """Report tab: report sections and JSON/PDF downloads"""
+    results = st.session_state.weed_detection_results
+    
+    st.markdown("### 📄 Comprehensive Report")
+    
+    # Generate report (cached: tab switches and chat messages reuse the same payload)
+    image_info = results['image_info']
+    
+    # The mask and image info are left out of the results key (only scalar fields feed the report)
+    report_fields = {key: value for key, value in results.items() if key not in ('weed_mask', 'image_info')}
+    report = generate_weed_report(report_fields, image_info)
+    
+    # Display report sections
+    st.markdown("#### 📋 Executive Summary")
+    st.json(report['executive_summary'])
+    
+    st.markdown("#### ⚠️ Risk Assessment")
+    st.json(report['risk_assessment'])
+    
+    st.markdown("#### ⏰ Timeline Recommendations")
+    st.json(report['timeline_recommendations'])
+    
+    st.markdown("#### 💰 Cost-Benefit Analysis")
+    st.json(report['cost_benefit_analysis'])
+    
+    st.markdown("#### ✅ Action Checklist")
+    st.markdown("  \n".join(report['action_checklist']))
+    
+    st.markdown("#### 🔄 Follow-up Actions")
+    st.markdown("  \n".join(f"• {action}" for action in report['follow_up_actions']))
+    
+    st.markdown("#### 🛡️ Prevention Strategies")
+    st.markdown("  \n".join(f"• {strategy}" for strategy in report['prevention_strategies']))
+    
+    # Download report
+    report_json = _dump_report(report)
+    st.download_button(
+        label="📄 Download Detailed Report",
+        data=report_json,
+        file_name=f"weed_analysis_report_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
+        mime="application/json"
+    )
+    
+    # PDF download (rendered once per report)
+    try:
+        st.download_button(
+            label="📄 Download PDF Report",
+            data=report_to_pdf(report_json),
+            file_name=f"weed_analysis_report_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf",
+            mime="application/pdf"
+        )
+    except Exception as e:
+        st.error(f"❌ PDF generation error: {e}")
+
+@st.fragment
+def _render_chat_tab():
+    """Chat Assistant tab: chatbot seeded with the analysis context"""
+    results = st.session_state.weed_detection_results
+    
+    st.markdown("### 💬 Chat with Weed Management Expert")
+    analysis_context = f"Weed Coverage: {results['weed_percentage']:.1f}%, Severity: {results['severity_level']}, Recommended: {results['recommended_action']}"
+    
+    # Enhanced Weed Detection Chatbot with Groq API
+    st.markdown("""
+    <div style="background: linear-gradient(135deg, #fff8e1 0%, #ffecb3 100%); 
+                padding: 1.5rem; border-radius: 15px; margin: 1rem 0; 
+                border: 2px solid #FFA500; box-shadow: 0 8px 25px rgba(0,0,0,0.1);">
+        <h3 style="color: #f57c00; margin-bottom: 1rem; text-align: center;">
+            🌱 Weed Management Specialist Chatbot
+        </h3>
+        <p style="text-align: center; color: #666; margin-bottom: 1rem;">
+            Powered by Groq AI - Specialized in weed identification, herbicide selection, and precision farming
+        </p>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    # Use the enhanced chat interface with unique key
+    try:
+        from modules.enhanced_chatbot import create_chat_interface
+        create_chat_interface("weed_detection", analysis_context, use_api=True, unique_key="weed_detection_analysis_chat")
+    except Exception as e:
+        st.error(f"❌ Chatbot error: {str(e)}")
+        st.info("💡 Please try refreshing the page or contact support.")
+
+def render_results_tabs():
+    """Render the analysis tabs from results persisted in st.session_state
+
+    Each tab is its own fragment, so a widget inside one tab (chat input, download
+    button) reruns only that tab instead of the whole page and every chart.
+    """
+    tab1, tab2, tab3, tab4 = st.tabs(["📊 Overview", "🔍 Detailed Analysis", "📄 Report", "💬 Chat Assistant"])
+    
+    with tab1:
+        _render_overview_tab()
+    
+    with tab2:
+        _render_detailed_tab()
+    
+    with tab3:
+        _render_report_tab()
+    
+    with tab4:
+        _render_chat_tab()
 
 def main():
     st.markdown("""
@@ -224,7 +609,18 @@ def main():
     
     if uploaded_file is not None:
         # Display image information
-        image = Image.open(uploaded_file)
+        # Decode once per upload into a contiguous RGB uint8 array, reused by every rerun
+        if st.session_state.get('weed_detection_image_id') != uploaded_file.file_id:
+            with Image.open(uploaded_file) as pil_image:
+                st.session_state.weed_detection_image = np.ascontiguousarray(pil_image.convert('RGB'), dtype=np.uint8)
+            st.session_state.weed_detection_image_small = downsample_for_analysis(st.session_state.weed_detection_image)
+            st.session_state.weed_detection_image_id = uploaded_file.file_id
+        image = st.session_state.weed_detection_image
+        image_height, image_width = image.shape[:2]
+        
+        # Mask and overlay run on the downsampled copy; the full image is only displayed
+        image_small = st.session_state.weed_detection_image_small
+        analysis_height, analysis_width = image_small.shape[:2]
         st.image(image, caption="Uploaded Field Image", use_column_width=True)
         
         # Image information
@@ -232,253 +628,32 @@ def main():
         with col1:
             st.info(f"**File Size:** {uploaded_file.size / 1024:.1f} KB")
         with col2:
-            st.info(f"**Dimensions:** {image.size[0]} × {image.size[1]}")
+            st.info(f"**Dimensions:** {image_width} × {image_height}")
         with col3:
             st.info(f"**Format:** {uploaded_file.type}")
         
         # Analysis button
         if st.button("🔍 Analyze Weeds", type="primary", use_container_width=True):
             with st.spinner("🤖 Analyzing weeds using AI segmentation..."):
-                # Simulate weed detection
-                weed_percentage = random.uniform(5, 45)
-                crop_percentage = 100 - weed_percentage
-                
-                # Determine severity level
-                if weed_percentage > 30:
-                    severity_level = "High"
-                elif weed_percentage > 15:
-                    severity_level = "Medium"
-                else:
-                    severity_level = "Low"
-                
-                # Generate recommendations
-                recommendations = {
-                    "High": "Immediate herbicide application required",
-                    "Medium": "Targeted herbicide application recommended",
-                    "Low": "Manual weeding or spot treatment sufficient"
-                }
-                
-                # Create weed mask
-                weed_mask = create_weed_mask(image.size, weed_percentage)
+                # Simulated analysis, cached per uploaded file
+                results = _run_weed_analysis(uploaded_file.getvalue(), (analysis_width, analysis_height))
                 
-                # Store results
-                results = {
-                    'weed_percentage': weed_percentage,
-                    'crop_percentage': crop_percentage,
-                    'severity_level': severity_level,
-                    'recommended_action': recommendations[severity_level],
-                    'weed_mask': weed_mask
+                # Keep what the tabs need for reruns (chat input, downloads)
+                results['image_id'] = uploaded_file.file_id
+                results['image_info'] = {
+                    'filename': uploaded_file.name,
+                    'size': uploaded_file.size,
+                    'dimensions': f"{image_width}x{image_height}",
+                    'analysis_dimensions': f"{analysis_width}x{analysis_height}",
+                    'analysis_scale': analysis_width / image_width
                 }
                 
                 st.session_state.weed_detection_results = results
-                
-                # Display results in tabs
-                tab1, tab2, tab3, tab4 = st.tabs(["📊 Overview", "🔍 Detailed Analysis", "📄 Report", "💬 Chat Assistant"])
-                
-                with tab1:
-                    st.markdown("### 📈 Analysis Results")
-                    
-                    # Key metrics
-                    col1, col2, col3, col4 = st.columns(4)
-                    
-                    with col1:
-                        st.markdown(f"""
-                        <div class="metric-container">
-                            <h2 style="color: #FF6B6B;">{weed_percentage:.1f}%</h2>
-                            <p>Weed Coverage</p>
-                        </div>
-                        """, unsafe_allow_html=True)
-                    
-                    with col2:
-                        st.markdown(f"""
-                        <div class="metric-container">
-                            <h2 style="color: #32CD32;">{crop_percentage:.1f}%</h2>
-                            <p>Crop Coverage</p>
-                        </div>
-                        """, unsafe_allow_html=True)
-                    
-                    with col3:
-                        severity_color = "#FF6B6B" if severity_level == "High" else "#FFA500" if severity_level == "Medium" else "#32CD32"
-                        st.markdown(f"""
-                        <div class="metric-container">
-                            <h2 style="color: {severity_color};">{severity_level}</h2>
-                            <p>Severity Level</p>
-                        </div>
-                        """, unsafe_allow_html=True)
-                    
-                    with col4:
-                        st.markdown(f"""
-                        <div class="metric-container">
-                            <h2 style="color: #228B22;">{recommendations[severity_level].split()[0]}</h2>
-                            <p>Recommended Action</p>
-                        </div>
-                        """, unsafe_allow_html=True)
-                    
-                    # Weed segmentation visualization
-                    st.markdown("### 🎯 Weed Segmentation")
-                    col1, col2 = st.columns(2)
-                    
-                    with col1:
-                        st.markdown("**Original Image**")
-                        st.image(image, use_column_width=True)
-                    
-                    with col2:
-                        st.markdown("**Weed Detection Mask**")
-                        weed_overlay = overlay_weed_mask(image, weed_mask)
-                        st.image(weed_overlay, use_column_width=True)
-                    
-                    # Coverage chart
-                    coverage_chart = create_weed_coverage_chart(weed_percentage, crop_percentage)
-                    st.plotly_chart(coverage_chart, use_container_width=True)
-                
-                with tab2:
-                    st.markdown("### 🔍 Detailed Analysis")
-                    
-                    # Weed analysis details
-                    st.markdown(f"""
-                    <div class="info-box">
-                        <h3>🌱 Weed Analysis Results</h3>
-                        <p><strong>Weed Coverage:</strong> {weed_percentage:.1f}% of the field area</p>
-                        <p><strong>Crop Coverage:</strong> {crop_percentage:.1f}% of the field area</p>
-                        <p><strong>Weed-to-Crop Ratio:</strong> {weed_percentage/crop_percentage:.2f}:1</p>
-                        <p><strong>Severity Level:</strong> {severity_level}</p>
-                    </div>
-                    """, unsafe_allow_html=True)
-                    
-                    # Impact assessment
-                    st.markdown("### 📊 Impact Assessment")
-                    
-                    impact_data = {
-                        "Yield Impact": 90 if severity_level == "High" else 60 if severity_level == "Medium" else 30,
-                        "Nutrient Competition": 85 if severity_level == "High" else 55 if severity_level == "Medium" else 25,
-                        "Water Competition": 80 if severity_level == "High" else 50 if severity_level == "Medium" else 20,
-                        "Harvest Difficulty": 75 if severity_level == "High" else 45 if severity_level == "Medium" else 15
-                    }
-                    
-                    impact_df = pd.DataFrame(list(impact_data.items()), columns=['Factor', 'Impact %'])
-                    st.bar_chart(impact_df.set_index('Factor'))
-                    
-                    # Treatment recommendations
-                    st.markdown("### 🛠️ Treatment Recommendations")
-                    
-                    treatment_options = {
-                        "High": [
-                            "Broadcast herbicide application",
-                            "Pre-emergence herbicide",
-                            "Post-emergence herbicide",
-                            "Mechanical cultivation"
-                        ],
-                        "Medium": [
-                            "Targeted herbicide application",
-                            "Spot treatment",
-                            "Manual weeding",
-                            "Mulching"
-                        ],
-                        "Low": [
-                            "Manual weeding",
-                            "Spot herbicide treatment",
-                            "Mulching",
-                            "Crop competition enhancement"
-                        ]
-                    }
-                    
-                    for i, option in enumerate(treatment_options[severity_level], 1):
-                        st.markdown(f"**{i}.** {option}")
-                    
-                    # Weed density heatmap
-                    st.markdown("### 🗺️ Weed Density Map")
-                    density_chart = create_weed_density_map(weed_mask)
-                    st.plotly_chart(density_chart, use_container_width=True)
-                    
-                    # Additional metrics
-                    col1, col2 = st.columns(2)
-                    with col1:
-                        st.metric("Treatment Priority", "High" if severity_level == "High" else "Medium")
-                        st.metric("Expected Control Success", f"{random.randint(85, 95)}%")
-                    with col2:
-                        st.metric("Treatment Cost", f"₹{random.randint(2000, 8000)}/hectare")
-                        st.metric("Recovery Time", f"{random.randint(14, 30)} days")
-                
-                with tab3:
-                    st.markdown("### 📄 Comprehensive Report")
-                    
-                    # Generate report
-                    image_info = {
-                        'filename': uploaded_file.name,
-                        'size': uploaded_file.size,
-                        'dimensions': f"{image.size[0]}x{image.size[1]}"
-                    }
-                    
-                    report = generate_weed_report(results, image_info)
-                    
-                    # Display report sections
-                    st.markdown("#### 📋 Executive Summary")
-                    st.json(report['executive_summary'])
-                    
-                    st.markdown("#### ⚠️ Risk Assessment")
-                    st.json(report['risk_assessment'])
-                    
-                    st.markdown("#### ⏰ Timeline Recommendations")
-                    st.json(report['timeline_recommendations'])
-                    
-                    st.markdown("#### 💰 Cost-Benefit Analysis")
-                    st.json(report['cost_benefit_analysis'])
-                    
-                    st.markdown("#### ✅ Action Checklist")
-                    for item in report['action_checklist']:
-                        st.markdown(item)
-                    
-                    st.markdown("#### 🔄 Follow-up Actions")
-                    for action in report['follow_up_actions']:
-                        st.markdown(f"• {action}")
-                    
-                    st.markdown("#### 🛡️ Prevention Strategies")
-                    for strategy in report['prevention_strategies']:
-                        st.markdown(f"• {strategy}")
-                    
-                    # Download report
-                    report_json = json.dumps(report, indent=2, default=str)
-                    st.download_button(
-                        label="📄 Download Detailed Report",
-                        data=report_json,
-                        file_name=f"weed_analysis_report_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
-                        mime="application/json"
-                    )
-                    
-                    # PDF download placeholder
-                    pdf_buffer = io.BytesIO()
-                    st.download_button(
-                        label="📄 Download PDF Report",
-                        data=pdf_buffer,
-                        file_name=f"weed_analysis_report_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf",
-                        mime="application/pdf"
-                    )
-                
-                with tab4:
-                    st.markdown("### 💬 Chat with Weed Management Expert")
-                    analysis_context = f"Weed Coverage: {results['weed_percentage']:.1f}%, Severity: {results['severity_level']}, Recommended: {results['recommended_action']}"
-                    
-                    # Enhanced Weed Detection Chatbot with Groq API
-                    st.markdown("""
-                    <div style="background: linear-gradient(135deg, #fff8e1 0%, #ffecb3 100%); 
-                                padding: 1.5rem; border-radius: 15px; margin: 1rem 0; 
-                                border: 2px solid #FFA500; box-shadow: 0 8px 25px rgba(0,0,0,0.1);">
-                        <h3 style="color: #f57c00; margin-bottom: 1rem; text-align: center;">
-                            🌱 Weed Management Specialist Chatbot
-                        </h3>
-                        <p style="text-align: center; color: #666; margin-bottom: 1rem;">
-                            Powered by Groq AI - Specialized in weed identification, herbicide selection, and precision farming
-                        </p>
-                    </div>
-                    """, unsafe_allow_html=True)
-                    
-                    # Use the enhanced chat interface with unique key
-                    try:
-                        from modules.enhanced_chatbot import create_chat_interface
-                        create_chat_interface("weed_detection", analysis_context, use_api=True, unique_key="weed_detection_analysis_chat")
-                    except Exception as e:
-                        st.error(f"❌ Chatbot error: {str(e)}")
-                        st.info("💡 Please try refreshing the page or contact support.")
+        
+        # Render the last analysis of this upload on every rerun (e.g. after a chat message)
+        results = st.session_state.get('weed_detection_results')
+        if results is not None and results.get('image_id') == uploaded_file.file_id:
+            render_results_tabs()
     
     else:
         st.info("👆 Please upload a field image to start weed analysis.")
@@ -1,6 +1,5 @@
 import streamlit as st
 import numpy as np
-import cv2
 import json
 import datetime
 import io
@@ -12,6 +11,9 @@ import plotly.express as px
 from modules import preprocessing, chatbot
 from modules.pdf_generator import PDFReportGenerator, create_download_button
 from config import MODEL_CONFIGS, CUSTOM_CSS
+from modules.kernels import NUMBA_AVAILABLE
+if NUMBA_AVAILABLE:
+    from modules.kernels import fused_vegetation_indices
 
 # Inject custom CSS
 st.markdown(CUSTOM_CSS, unsafe_allow_html=True)
@@ -98,6 +100,47 @@ def create_irrigation_recommendations_chart(recommendations):
     
     return fig
 
+# Resolution of the NIR / Red grids the vegetation indices are computed on
+ANALYSIS_SIZE = (512, 512)
+
+def load_band(image, mode="L"):
+    """Decode an uploaded band straight to ANALYSIS_SIZE (JPEGs decode at a reduced DCT scale)"""
+    image.draft(mode, ANALYSIS_SIZE)
+    return np.asarray(image.convert(mode).resize(ANALYSIS_SIZE, Image.BILINEAR, reducing_gap=2.0))
+
+def load_preview(image):
+    """Decode an upload as an RGB preview no larger than ANALYSIS_SIZE, keeping its aspect ratio"""
+    image.draft("RGB", ANALYSIS_SIZE)
+    preview = image.convert("RGB")
+    preview.thumbnail(ANALYSIS_SIZE, Image.BILINEAR)
+    return np.asarray(preview)
+
+def compute_vegetation_indices(nir_band, red_band):
+    """NDVI, EVI, NDWI and SAVI maps as the planes of one (4, H, W) float32 array"""
+    indices = np.empty((4,) + nir_band.shape, dtype=np.float32)
+    red_mean = np.float32(red_band.mean())
+    
+    if NUMBA_AVAILABLE:
+        fused_vegetation_indices(nir_band, red_band, red_mean, indices)
+        return indices
+    
+    # NumPy fallback: cast once, share nir - red / nir + red across the indices
+    nir_f = nir_band.astype(np.float32)
+    red_f = red_band.astype(np.float32)
+    diff = nir_f - red_f
+    total = nir_f + red_f
+    
+    np.divide(diff, np.where(total == 0, np.float32(1e-6), total), out=indices[0])
+    evi_den = nir_f + 6 * red_f - 7.5 * red_mean + 1
+    indices[1] = 0
+    np.divide(2.5 * diff, evi_den, out=indices[1], where=evi_den != 0)
+    indices[2] = indices[0]
+    total += 0.5
+    np.divide(diff, total, out=indices[3])
+    indices[3] *= 1.5
+    
+    return indices
+
 def generate_irrigation_report(analysis_results, image_info):
     """Generate comprehensive irrigation management report"""
     report = {
@@ -178,9 +221,9 @@ def main():
                     tif_image = Image.open(file)
                     bands = tif_image.split()
                     if len(bands) >= 4:
-                        red_image = np.array(bands[0])
-                        nir_image = np.array(bands[3])
-                        original_image = np.array(tif_image.convert('RGB'))
+                        red_image = load_band(bands[0], bands[0].mode)
+                        nir_image = load_band(bands[3], bands[3].mode)
+                        original_image = load_preview(tif_image)
                         st.success("✅ NIR and Red channels found in multispectral .TIF file")
                         break
                     else:
@@ -195,11 +238,11 @@ def main():
             for file in uploaded_files:
                 file_name_lower = file.name.lower()
                 if 'nir' in file_name_lower:
-                    nir_image = np.array(Image.open(file).convert('L'))
+                    nir_image = load_band(Image.open(file))
                 elif 'red' in file_name_lower:
-                    red_image = np.array(Image.open(file).convert('L'))
+                    red_image = load_band(Image.open(file))
                 elif original_image is None:
-                    original_image = np.array(Image.open(file).convert('RGB'))
+                    original_image = load_preview(Image.open(file))
             
             if nir_image is not None and red_image is not None:
                 st.success("✅ NIR and Red channels found from separate files")
@@ -238,38 +281,12 @@ def main():
                         st.error("❌ Invalid image data - empty arrays detected")
                         return
                     
-                    # Resize images for consistent analysis with proper validation
-                    try:
-                        nir_resized = cv2.resize(nir_image, (512, 512))
-                        red_resized = cv2.resize(red_image, (512, 512))
-                    except cv2.error as e:
-                        st.error(f"❌ Image resize error: {e}")
-                        st.info("💡 Please try uploading different images")
-                        return
-                    
-                    # Calculate multiple vegetation indices
-                    ndvi_map = preprocessing.calculate_ndvi(nir_resized, red_resized)
-                    
-                    # Additional vegetation indices for comprehensive analysis
-                    # Enhanced Vegetation Index (EVI)
-                    evi_map = (2.5 * (nir_resized - red_resized)) / (nir_resized + 6 * red_resized - 7.5 * np.mean(red_resized) + 1)
-                    
-                    # Normalized Difference Water Index (NDWI)
-                    ndwi_map = (nir_resized - red_resized) / (nir_resized + red_resized)
+                    # Bands are already decoded at the analysis resolution (see load_band)
+                    nir_resized = nir_image
+                    red_resized = red_image
                     
-                    # Soil Adjusted Vegetation Index (SAVI)
-                    savi_map = ((nir_resized - red_resized) / (nir_resized + red_resized + 0.5)) * 1.5
-                    
-                    # Green Normalized Difference Vegetation Index (GNDVI)
-                    if original_image is not None:
-                        try:
-                            green_channel = cv2.cvtColor(cv2.resize(original_image, (512, 512)), cv2.COLOR_RGB2GRAY)
-                            gndvi_map = (nir_resized - green_channel) / (nir_resized + green_channel)
-                        except cv2.error:
-                            # Fallback if green channel extraction fails
-                            gndvi_map = np.zeros_like(ndvi_map)
-                    else:
-                        gndvi_map = np.zeros_like(ndvi_map)
+                    # Calculate multiple vegetation indices (NDVI, EVI, NDWI, SAVI) in one fused pass
+                    ndvi_map, evi_map, ndwi_map, savi_map = compute_vegetation_indices(nir_resized, red_resized)
                     
                     # Classify stress zones using multiple indices
                     stress_zones = preprocessing.classify_ndvi_zones(ndvi_map)
@@ -151,7 +151,7 @@ with tab1:
                     if model_path and model_path.exists():
                             try:
                                 # Try loading with compile=False to avoid custom object issues
-                                model = tf.keras.models.load_model(str(model_path), compile=False)
+                                model = load_xai_model(model_path)
                                 model_available = True
                                 st.success(f"✅ Model loaded successfully!")
                             except Exception as load_error:
@@ -360,6 +360,107 @@ with tab1:
                     """)
 
 # ==================== TAB 2: LIME ====================
+def _render_lime_result(job):
+    """Show a finished background LIME run (a failed run is dropped so the button can start a new one)"""
+    try:
+        explanation = job['future'].result()
+    except Exception as e:
+        explanation = None
+        st.warning(f"⚠️ Error: {str(e)}")
+    if explanation is None:
+        del st.session_state.lime_job
+        return
+    
+    from skimage.segmentation import mark_boundaries
+    
+    img_resized = job['image']
+    predictions = job['predictions']
+    class_names = MODEL_CONFIGS['crop_health']['class_names']
+    pred_class = np.argmax(predictions)
+    
+    # Get image and mask
+    temp, mask = explanation.get_image_and_mask(
+        pred_class,
+        positive_only=False,
+        num_features=10,
+        hide_rest=False
+    )
+    
+    # Display results
+    st.success(f"✅ Prediction: **{class_names[pred_class]}** (Confidence: {predictions[pred_class]*100:.1f}%)")
+    
+    col1, col2, col3 = st.columns(3)
+    
+    with col1:
+        st.subheader("Original Image")
+        st.image(img_resized, use_container_width=True)
+    
+    with col2:
+        st.subheader("LIME Explanation")
+        # Show boundaries
+        img_boundary = mark_boundaries(temp/255.0, mask)
+        st.image(img_boundary, use_container_width=True)
+    
+    with col3:
+        st.subheader("Important Regions")
+        # Show only positive contributions
+        temp_pos, mask_pos = explanation.get_image_and_mask(
+            pred_class,
+            positive_only=True,
+            num_features=5,
+            hide_rest=True
+        )
+        st.image(temp_pos, use_container_width=True)
+    
+    # Feature importance
+    st.markdown("### 📊 Superpixel Importance")
+    
+    # Get local explanation
+    local_exp = explanation.local_exp[pred_class]
+    
+    # Sort by importance
+    sorted_exp = sorted(local_exp, key=lambda x: abs(x[1]), reverse=True)[:10]
+    
+    # Create bar chart
+    segments = [f"Segment {x[0]}" for x in sorted_exp]
+    scores = [x[1] for x in sorted_exp]
+    colors = ['green' if s > 0 else 'red' for s in scores]
+    
+    fig = go.Figure(data=[
+        go.Bar(
+            y=segments,
+            x=scores,
+            orientation='h',
+            marker_color=colors,
+            text=[f"{s:.3f}" for s in scores],
+            textposition='auto'
+        )
+    ])
+    
+    fig.update_layout(
+        title="Top 10 Superpixel Contributions",
+        xaxis_title="Contribution Score",
+        yaxis_title="Superpixel",
+        height=500
+    )
+    
+    st.plotly_chart(fig, use_container_width=True)
+    
+    st.info("""
+    💡 **How to Interpret:**
+    - 🟢 **Green bars**: Positive contribution (supports the prediction)
+    - 🔴 **Red bars**: Negative contribution (against the prediction)
+    - Larger absolute values = More important regions
+    - The highlighted regions in the middle image show which parts influenced the decision
+    """)
+
+@st.fragment(run_every=1.0)
+def _poll_lime_job():
+    """Progress note while the background LIME run is going; reruns the page once it finishes"""
+    if st.session_state.lime_job['future'].done():
+        st.rerun()
+    st.info("⏳ Generating LIME explanation in the background...")
+
 with tab2:
     st.header("🔬 LIME: Local Interpretable Explanations")
     
@@ -440,6 +541,7 @@ with tab2:
         image_np = np.array(image)
         
         num_samples = st.slider("Number of Samples", 100, 2000, 1000, 100, key="lime_samples")
+        lime_key = (uploaded_file_lime.file_id, num_samples)
         
         if st.button("🚀 Generate LIME Explanation", key="lime_button"):
             with st.spinner("Generating LIME explanation..."):
@@ -467,7 +569,7 @@ with tab2:
                     model_path = Path(MODELS_DIR) / "crop_health_model.h5"
                     if model_path.exists() and lime_available:
                         try:
-                            model = tf.keras.models.load_model(str(model_path), compile=False)
+                            model = load_xai_model(model_path)
                             model_available = True
                             st.success("✅ Model loaded successfully!")
                         except Exception as load_error:
@@ -478,107 +580,17 @@ with tab2:
                             # Preprocess
                             img_resized = cv2.resize(image_np, (224, 224))
                             
-                            # Create explainer
-                            explainer = lime_image.LimeImageExplainer()
-                            
-                            # Prediction function
-                            def predict_fn(images):
-                                processed = []
-                                for img in images:
-                                    img_norm = img / 255.0
-                                    processed.append(img_norm)
-                                processed = np.array(processed)
-                                return model.predict(processed, verbose=0)
-                            
-                            # Generate explanation
-                            explanation = explainer.explain_instance(
-                                img_resized,
-                                predict_fn,
-                                top_labels=3,
-                                hide_color=0,
-                                num_samples=num_samples
-                            )
-                            
                             # Get prediction
                             predictions = model.predict(np.expand_dims(img_resized/255.0, axis=0), verbose=0)[0]
-                            class_names = MODEL_CONFIGS['crop_health']['class_names']
-                            pred_class = np.argmax(predictions)
-                            
-                            # Get image and mask
-                            temp, mask = explanation.get_image_and_mask(
-                                pred_class,
-                                positive_only=False,
-                                num_features=10,
-                                hide_rest=False
-                            )
-                            
-                            # Display results
-                            st.success(f"✅ Prediction: **{class_names[pred_class]}** (Confidence: {predictions[pred_class]*100:.1f}%)")
-                            
-                            col1, col2, col3 = st.columns(3)
-                            
-                            with col1:
-                                st.subheader("Original Image")
-                                st.image(img_resized, use_container_width=True)
-                            
-                            with col2:
-                                st.subheader("LIME Explanation")
-                                # Show boundaries
-                                img_boundary = mark_boundaries(temp/255.0, mask)
-                                st.image(img_boundary, use_container_width=True)
-                            
-                            with col3:
-                                st.subheader("Important Regions")
-                                # Show only positive contributions
-                                temp_pos, mask_pos = explanation.get_image_and_mask(
-                                    pred_class,
-                                    positive_only=True,
-                                    num_features=5,
-                                    hide_rest=True
-                                )
-                                st.image(temp_pos, use_container_width=True)
                             
-                            # Feature importance
-                            st.markdown("### 📊 Superpixel Importance")
-                            
-                            # Get local explanation
-                            local_exp = explanation.local_exp[pred_class]
-                            
-                            # Sort by importance
-                            sorted_exp = sorted(local_exp, key=lambda x: abs(x[1]), reverse=True)[:10]
-                            
-                            # Create bar chart
-                            segments = [f"Segment {x[0]}" for x in sorted_exp]
-                            scores = [x[1] for x in sorted_exp]
-                            colors = ['green' if s > 0 else 'red' for s in scores]
-                            
-                            fig = go.Figure(data=[
-                                go.Bar(
-                                    y=segments,
-                                    x=scores,
-                                    orientation='h',
-                                    marker_color=colors,
-                                    text=[f"{s:.3f}" for s in scores],
-                                    textposition='auto'
-                                )
-                            ])
-                            
-                            fig.update_layout(
-                                title="Top 10 Superpixel Contributions",
-                                xaxis_title="Contribution Score",
-                                yaxis_title="Superpixel",
-                                height=500
-                            )
-                            
-                            st.plotly_chart(fig, use_container_width=True)
-                            
-                            st.info("""
-                            💡 **How to Interpret:**
-                            - 🟢 **Green bars**: Positive contribution (supports the prediction)
-                            - 🔴 **Red bars**: Negative contribution (against the prediction)
-                            - Larger absolute values = More important regions
-                            - The highlighted regions in the middle image show which parts influenced the decision
-                            """)
+                            # Explanation runs on a background thread (cached per image, model file and
+                            # sample count); the result is shown below once the run finishes
+                            st.session_state.lime_job = {
+                                'key': lime_key,
+                                'image': img_resized,
+                                'predictions': predictions,
+                                'future': submit_lime_explanation(img_resized, model, num_samples, top_labels=3)
+                            }
                     else:
                         if not model_path.exists():
                             st.warning("⚠️ Model file not found on Streamlit Cloud")
@@ -684,6 +696,14 @@ with tab2:
                     2. LIME library must be installed
                     3. Scores would be based on actual model predictions
                     """)
+        
+        # Background LIME run for this image and sample count: polled until it finishes
+        lime_job = st.session_state.get('lime_job')
+        if lime_job is not None and lime_job['key'] == lime_key:
+            if lime_job['future'].done():
+                _render_lime_result(lime_job)
+            else:
+                _poll_lime_job()
 
 # ==================== TAB 3: SHAP ====================
 with tab3: